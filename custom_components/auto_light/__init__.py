@@ -1,416 +1,654 @@
 """Auto Light integration for Home Assistant."""
 import asyncio
 import logging
+from datetime import timedelta
+from functools import partial
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from .const import DOMAIN
+from homeassistant.core import HomeAssistant, callback
+from .const import (
+    DOMAIN,
+    DATA_ACTUATION_QUEUE,
+    DATA_ZONE_GRAPH,
+    DATA_PROFILER,
+    DATA_SOLAR_ESTIMATOR,
+    CONF_PRESENCE_SENSOR,
+    CONF_BRIGHTNESS_SENSOR,
+    CONF_BRIGHTNESS_THRESHOLD,
+    CONF_DELAY_OFF_TIME,
+    CONF_TIMELINE_DAYS,
+    CONF_TUNING_MODE,
+    CONF_NEIGHBORS,
+    CONF_LIGHT_WATTAGE,
+    CONF_OBSERVE_STATES,
+    DEFAULT_OBSERVE_STATES,
+    DEFAULT_TIMELINE_DAYS,
+    DEFAULT_TUNING_MODE,
+    TIMELINE_RECORDS_PER_DAY,
+    TIMELINE_MAX_RECORDS_PER_DAY,
+    TUNING_MODE_OFF,
+    TUNING_MODE_APPLY,
+    MANUAL_OVERRIDE_WINDOW,
+    PREARM_DEPARTURE_WINDOW,
+    TUNING_APPLY_HOUR,
+    ACTION_TURN_ON,
+    ACTION_SKIP_BRIGHT,
+    STATE_ON,
+    STATE_OFF,
+    SERVICE_GET_TIMELINE,
+    SERVICE_PROFILE,
+)
+from .actuator import get_actuation_queue
+from .decision import (
+    ZoneConfig,
+    Inputs,
+    RuntimeState,
+    TurnOn,
+    TurnOff,
+    SetSegment,
+    ScheduleDelayOff,
+    Transition,
+    Record,
+    brightness_lux,
+    detect_brightness_kind,
+    is_person_present,
+    decide_presence_change,
+    decide_delay_off_expired,
+    decide_periodic,
+    decide_prearm,
+    decide_handoff,
+)
+from .energy import EnergyMeter
+from .freshness import InputTracker, reported_at
+from .lightcache import LightStateCache
+from .profiling import CAPTURES, CAPTURE_NONE, DEFAULT_TOP_FUNCTIONS, get_profiler
+from .resources import EntryResources
+from .solar import get_solar_estimator
+from .timeline import OccupancyTimeline, TimelineStore
+from .tuner import TunerStore
+from .vocabulary import ROLE_PRESENCE, ROLE_BRIGHTNESS, StateVocabulary
+from .zones import get_zone_graph
 
 _LOGGER = logging.getLogger(__name__)
 
+PLATFORMS = ["switch", "sensor"]
+
 async def async_setup(hass: HomeAssistant, config):
     """Set up the Auto Light component."""
+    import voluptuous as vol
+    from homeassistant.core import ServiceCall, SupportsResponse
+    from homeassistant.exceptions import ServiceValidationError
+    from homeassistant.util import dt as dt_util
+    
+    async def handle_get_timeline(call: ServiceCall):
+        """Return the recorded occupancy timeline of an entry."""
+        entry_id = call.data["config_entry_id"]
+        entry_data = hass.data.get(DOMAIN, {}).get(entry_id)
+        if entry_data is None or "timeline_store" not in entry_data["state"]:
+            raise ServiceValidationError(f"未找到灯光自动化条目: {entry_id}")
+        since = None
+        if "days" in call.data:
+            since = dt_util.utcnow() - timedelta(days=call.data["days"])
+        timeline = entry_data["state"]["timeline_store"].timeline
+        return {"records": timeline.records(since)}
+    
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_TIMELINE,
+        handle_get_timeline,
+        schema=vol.Schema(
+            {
+                vol.Required("config_entry_id"): str,
+                vol.Optional("days"): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            }
+        ),
+        supports_response=SupportsResponse.ONLY,
+    )
+    
+    async def handle_profile(call: ServiceCall):
+        """Profile the hot paths of all entries for a number of seconds."""
+        profiler = get_profiler(hass)
+        duration = call.data["duration"]
+        capture = call.data["capture"]
+        try:
+            profiler.start(capture)
+        except RuntimeError as e:
+            raise ServiceValidationError(str(e)) from e
+        _LOGGER.info(f"开始性能分析: 时长={duration}秒, 采集方式={capture}")
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            report = profiler.stop(call.data["top"])
+        
+        # 分析结果以 pstats 格式保存到配置目录，可用 snakeviz 等工具查看
+        stats_path = None
+        if capture != CAPTURE_NONE:
+            stats_path = hass.config.path(
+                f"{DOMAIN}_profile_{dt_util.now().strftime('%Y%m%d_%H%M%S')}.prof"
+            )
+            report["stats_file"] = stats_path
+        await hass.async_add_executor_job(profiler.save_stats, stats_path)
+        _LOGGER.info(f"性能分析完成: {report['timings']}")
+        return report
+    
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        handle_profile,
+        schema=vol.Schema(
+            {
+                vol.Optional("duration", default=30): vol.All(
+                    vol.Coerce(int), vol.Range(min=1, max=600)
+                ),
+                vol.Optional("capture", default=CAPTURE_NONE): vol.In(CAPTURES),
+                vol.Optional("top", default=DEFAULT_TOP_FUNCTIONS): vol.All(
+                    vol.Coerce(int), vol.Range(min=1, max=200)
+                ),
+            }
+        ),
+        supports_response=SupportsResponse.OPTIONAL,
+    )
     return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
-    """Set up Auto Light from a config entry."""
+    """Set up Auto Light from a config entry.
+    
+    Everything the entry creates is registered in its ``EntryResources``,
+    which a single ``async_on_unload`` callback releases, so a failed setup,
+    an unload and a reload all clean up the same way. The callback is
+    synchronous; the stores are saved by ``async_unload_entry``.
+    """
     hass.data.setdefault(DOMAIN, {})
+    resources = EntryResources(entry.entry_id)
     # 创建一个可写的字典来存储数据
-    hass.data[DOMAIN][entry.entry_id] = {
+    entry_data = {
         "config": dict(entry.data),
-        "state": {}
+        "state": {"resources": resources}
     }
+    hass.data[DOMAIN][entry.entry_id] = entry_data
+    entry.async_on_unload(partial(_release_entry, hass, entry.entry_id, entry_data))
+    
+    # 加载人在时间线
+    timeline_days = entry.data.get(CONF_TIMELINE_DAYS, DEFAULT_TIMELINE_DAYS)
+    timeline_store = TimelineStore(
+        hass,
+        entry.entry_id,
+        OccupancyTimeline(
+            timeline_days * TIMELINE_RECORDS_PER_DAY,
+            retention=timedelta(days=timeline_days),
+            max_capacity=timeline_days * TIMELINE_MAX_RECORDS_PER_DAY,
+        ),
+    )
+    await timeline_store.async_load()
+    entry_data["state"]["timeline_store"] = timeline_store
+    resources.add_store(timeline_store)
+    
+    # 加载参数调优数据，自动应用模式下使用已学习的参数，用户修改过的参数除外
+    tuning_mode = entry.data.get(CONF_TUNING_MODE, DEFAULT_TUNING_MODE)
+    if tuning_mode != TUNING_MODE_OFF:
+        tuner_store = TunerStore(hass, entry.entry_id)
+        await tuner_store.async_load()
+        entry_data["state"]["tuner_store"] = tuner_store
+        resources.add_store(tuner_store)
+        if tuning_mode == TUNING_MODE_APPLY:
+            overridden = tuner_store.tuner.discard_overridden(entry.data)
+            if overridden:
+                _LOGGER.info(f"参数已被用户修改，丢弃学习结果并重新学习: {overridden}")
+                tuner_store.async_schedule_save()
+            if tuner_store.tuner.applied:
+                _LOGGER.info(f"应用已学习的参数: {tuner_store.tuner.applied}")
+                entry_data["config"].update(tuner_store.tuner.applied)
     
     # Create automation based on config
-    await _create_automation(hass, entry)
+    _create_automation(hass, entry)
     
-    # 设置开关平台
-    hass.async_create_task(
-        hass.config_entries.async_forward_entry_setups(entry, ["switch"])
-    )
+    # 更新区域相邻关系
+    zone_graph = get_zone_graph(hass)
+    zone_graph.set_neighbors(entry.entry_id, entry.data.get(CONF_NEIGHBORS, []))
+    resources.track("zone_graph", partial(zone_graph.remove, entry.entry_id))
+    
+    # 设置平台
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     
     entry.async_on_unload(entry.add_update_listener(update_listener))
     return True
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
-    """Unload a config entry."""
-    # 卸载开关平台
-    await hass.config_entries.async_unload_platforms(entry, ["switch"])
-    
-    # Remove automation and clean up listeners
-    if entry.entry_id in hass.data[DOMAIN]:
-        # 移除事件监听器
-        if "state" in hass.data[DOMAIN][entry.entry_id]:
-            state_data = hass.data[DOMAIN][entry.entry_id]["state"]
-            if "remove_state_listener" in state_data and state_data["remove_state_listener"] is not None:
-                state_data["remove_state_listener"]()
-            if "remove_interval" in state_data and state_data["remove_interval"] is not None:
-                state_data["remove_interval"]()
-            
-            # 取消延迟关灯任务
-            if "delay_off_task" in state_data and state_data["delay_off_task"] is not None:
-                state_data["delay_off_task"]()
-        
-        # 删除组件数据
-        del hass.data[DOMAIN][entry.entry_id]
+    """Unload a config entry.
     
-    return True
+    Listeners and timers are removed before the stores are saved, and the
+    save is awaited here: Home Assistant does not await coroutines passed to
+    ``async_on_unload``, so a reload could otherwise load the stores before
+    the final save.
+    """
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if unload_ok and entry_data is not None:
+        _release_entry(hass, entry.entry_id, entry_data)
+        # 保存人在时间线和调优数据，完成后才允许重新加载
+        await entry_data["state"]["resources"].async_save_stores()
+    return unload_ok
+
+@callback
+def _release_entry(hass: HomeAssistant, entry_id: str, entry_data: dict):
+    """Release the listeners and timers of an entry; safe to call more than once."""
+    domain_data = hass.data.get(DOMAIN, {})
+    # 仅删除本次设置创建的数据，避免误删重新加载后的新数据
+    if domain_data.get(entry_id) is entry_data:
+        del domain_data[entry_id]
+    
+    # 移除监听器和定时器
+    entry_data["state"]["resources"].release()
+    
+    # 最后一个条目卸载后停止全局命令队列
+    if set(domain_data) <= {
+        DATA_ACTUATION_QUEUE, DATA_ZONE_GRAPH, DATA_PROFILER, DATA_SOLAR_ESTIMATOR
+    }:
+        if DATA_ACTUATION_QUEUE in domain_data:
+            domain_data.pop(DATA_ACTUATION_QUEUE).async_cancel()
+        domain_data.pop(DATA_ZONE_GRAPH, None)
+        if DATA_SOLAR_ESTIMATOR in domain_data:
+            domain_data.pop(DATA_SOLAR_ESTIMATOR).async_cancel()
+        # 正在进行的性能分析由服务调用自行结束
+        domain_data.pop(DATA_PROFILER, None)
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Remove persisted data of a deleted config entry."""
+    await TimelineStore(hass, entry.entry_id, OccupancyTimeline(1)).async_remove()
+    await TunerStore(hass, entry.entry_id).async_remove()
 
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry):
     """Handle options update."""
     await hass.config_entries.async_reload(entry.entry_id)
 
-async def _create_automation(hass: HomeAssistant, entry: ConfigEntry):
-    """Create automation based on config entry."""
-    from homeassistant.helpers.event import async_track_state_change_event, async_track_time_interval
-    from datetime import timedelta
-    import datetime
-    from homeassistant.components.light import DOMAIN as LIGHT_DOMAIN
-    from homeassistant.const import (
-        STATE_ON,
-        STATE_OFF,
+def _detect_brightness_kind(hass: HomeAssistant, entity_id: str) -> str:
+    """Detect how the brightness sensor reports from its registry entry and state."""
+    from homeassistant.helpers import entity_registry as er
+    
+    device_class = unit = state_class = options = None
+    registry_entry = er.async_get(hass).async_get(entity_id)
+    if registry_entry is not None:
+        device_class = registry_entry.device_class or registry_entry.original_device_class
+        unit = registry_entry.unit_of_measurement
+        capabilities = registry_entry.capabilities or {}
+        state_class = capabilities.get("state_class")
+        options = capabilities.get("options")
+    
+    # 启动时注册表信息可能不完整，用当前状态的属性补充
+    state = hass.states.get(entity_id)
+    if state is not None:
+        device_class = device_class or state.attributes.get("device_class")
+        unit = unit or state.attributes.get("unit_of_measurement")
+        state_class = state_class or state.attributes.get("state_class")
+        options = options or state.attributes.get("options")
+    
+    return detect_brightness_kind(
+        entity_id.split(".")[0], device_class, unit, state_class, options
     )
+
+def _create_automation(hass: HomeAssistant, entry: ConfigEntry):
+    """Create automation based on config entry.
+    
+    The decisions are made by the pure functions in ``decision.py``; this
+    function only wires Home Assistant events to them and executes the
+    returned actions. It does not wait for anything: the initial check runs
+    on the next loop iteration once Home Assistant has started.
+    """
+    from homeassistant.core import callback
+    from homeassistant.helpers.event import (
+        async_call_later,
+        async_track_state_change_event,
+        async_track_time_change,
+        async_track_time_interval,
+    )
+    from homeassistant.helpers.start import async_at_started
+    from homeassistant.util import dt as dt_util
     
     # 设置日志级别为INFO，确保所有重要日志都能输出
     _LOGGER.setLevel(logging.INFO)
     
     _LOGGER.info("=== 开始创建自动化任务 ===")
     
+    state_data = hass.data[DOMAIN][entry.entry_id]["state"]
+    resources = state_data["resources"]
     data = hass.data[DOMAIN][entry.entry_id]["config"]
-    sensor_type = data.get("sensor_type")
-    presence_sensor = data.get("presence_sensor")
-    brightness_sensor = data.get("brightness_sensor")
-    light_type = data.get("light_type")
-    lights = data.get("lights", [])
-    light_schedules = data.get("light_schedules", {})
-    name = data.get("name", "主卫灯光自动化")
+    presence_sensor = data.get(CONF_PRESENCE_SENSOR)
+    brightness_sensor = data.get(CONF_BRIGHTNESS_SENSOR)
+    brightness_kind = _detect_brightness_kind(hass, brightness_sensor)
+    _LOGGER.info(f"亮度传感器 {brightness_sensor} 的比较方式: {brightness_kind}")
+    state_data["brightness_kind"] = brightness_kind
+    zone = ZoneConfig(data, brightness_kind)
+    # 所有条目共用一个太阳照度估算器，每天只预计算一次照度表
+    solar_estimator = get_solar_estimator(hass)
+    actuation_queue = get_actuation_queue(hass)
+    # 性能分析默认关闭，关闭时计时包装只检查一个标志
+    profiler = get_profiler(hass)
+    timeline_store = state_data["timeline_store"]
+    tuner_store = state_data.get("tuner_store")
+    tuning_mode = data.get(CONF_TUNING_MODE, DEFAULT_TUNING_MODE)
+    zone_graph = get_zone_graph(hass)
+    
+    # 跟踪各输入的更新时间，用于判断读数是否过期
+    presence_tracker = InputTracker(presence_sensor, zone.presence_max_age)
+    brightness_tracker = InputTracker(brightness_sensor, zone.brightness_max_age)
+    state_data["input_trackers"] = {
+        "presence": presence_tracker,
+        "brightness": brightness_tracker,
+    }
     
     # 设置默认启用状态
-    hass.data[DOMAIN][entry.entry_id]["state"]["enabled"] = True
+    state_data["enabled"] = True
+    
+    # 订阅灯光状态变化维护灯光状态缓存并累计能耗，初始状态取当前状态
+    now_utc = dt_util.utcnow()
+    light_cache = LightStateCache(zone.lights)
+    energy_meter = EnergyMeter(zone.lights, data.get(CONF_LIGHT_WATTAGE, {}), now_utc)
+    for light in zone.lights:
+        light_state = hass.states.get(light)
+        light_cache.update(light, light_state.state if light_state else None)
+        energy_meter.observe_light(light, light_state.state if light_state else None, now_utc)
+    state_data["light_cache"] = light_cache
+    presence_state = hass.states.get(presence_sensor)
+    energy_meter.observe_presence(
+        presence_state is not None and is_person_present(zone, presence_state.state), now_utc
+    )
+    state_data["energy_meter"] = energy_meter
+    
+    # 观察模式下记录传感器上报的所有不同状态，并给出状态映射建议
+    vocabulary = None
+    if data.get(CONF_OBSERVE_STATES, DEFAULT_OBSERVE_STATES):
+        vocabulary = StateVocabulary()
+        state_data["vocabulary"] = vocabulary
+    
+    def observe_state(role, state):
+        """Count a sensor state in observation mode."""
+        if vocabulary is not None and state is not None and vocabulary.observe(role, state.state):
+            vocabulary.log_new_state(zone, role, state.state)
+    
+    observe_state(ROLE_PRESENCE, presence_state)
+    observe_state(ROLE_BRIGHTNESS, hass.states.get(brightness_sensor))
+    
+    def snapshot(presence_state=None):
+        """Read all inputs of the decision core at once."""
+        if presence_state is None:
+            presence_state = hass.states.get(presence_sensor)
+        brightness_state = hass.states.get(brightness_sensor)
+        presence_tracker.observe(presence_state)
+        brightness_tracker.observe(brightness_state)
+        
+        return Inputs(
+            presence_state=presence_state.state if presence_state else None,
+            presence_updated=reported_at(presence_state) if presence_state else None,
+            brightness_state=brightness_state.state if brightness_state else None,
+            brightness_updated=reported_at(brightness_state) if brightness_state else None,
+            light_states=light_cache.states,
+            sun_lux=solar_estimator.estimate(dt_util.now()) if zone.sun_fallback else None,
+            lights_on=light_cache.on_count,
+            lights_off=light_cache.off_count,
+        )
+    
+    def runtime():
+        """Return the runtime state of the zone."""
+        return RuntimeState(
+            enabled=state_data.get("enabled", True),
+            delay_off_deadline=state_data.get("delay_off_deadline"),
+            applied_segment=state_data.get("applied_segment"),
+        )
+    
+    @profiler.timed("execute")
+    def execute(actions):
+        """Execute the actions returned by the decision core."""
+        for action in actions:
+            kind = type(action)
+            if kind is TurnOn:
+                _LOGGER.info(f"正在打开灯光: {action.entity_id} {action.data or ''}")
+                actuation_queue.async_enqueue(action.entity_id, "turn_on", action.data)
+            elif kind is TurnOff:
+                _LOGGER.info(f"正在关闭灯光: {action.entity_id}")
+                actuation_queue.async_enqueue(action.entity_id, "turn_off")
+            elif kind is SetSegment:
+                state_data["applied_segment"] = action.segment
+            elif kind is ScheduleDelayOff:
+                _LOGGER.info(f"将在{action.delay}秒后检查并关闭灯光")
+                schedule_delay_off(action.delay)
+            elif kind is Transition:
+                now_utc = dt_util.utcnow()
+                energy_meter.observe_presence(action.presence, now_utc)
+                # 记录最近一次离开的时间，用于调优及避免相邻区域到达时为刚离开的区域预开灯
+                last_departure = state_data.pop("last_departure", None)
+                if not action.presence:
+                    state_data["last_departure"] = now_utc
+                observe_presence_transition(action.presence, last_departure)
+                if action.presence:
+                    hand_off_to_neighbors()
+            elif kind is Record:
+                record_decision(action)
+    
+    def record_decision(record):
+        """Record a decision in the occupancy timeline."""
+        now_utc = dt_util.utcnow()
+        timeline_store.timeline.record(now_utc, record.presence, record.lux, record.action)
+        timeline_store.async_schedule_save()
+        state_data["last_decision"] = (record.action, now_utc, record.lux)
     
-    def is_person_present(state):
-        """Determine if a person is present based on sensor state."""
-        _LOGGER.info(f"判断人在状态: 传感器类型={sensor_type}, 当前状态={state}")
+    def observe_presence_transition(presence, last_departure):
+        """Feed arrivals and departures to the tuner."""
+        if tuner_store is None:
+            return
+        if presence:
+            tuner_store.tuner.observe_arrival(brightness_lux(zone, brightness_tracker.last_state))
+            if last_departure is not None:
+                tuner_store.tuner.observe_return((dt_util.utcnow() - last_departure).total_seconds())
+        else:
+            tuner_store.tuner.observe_departure()
+        tuner_store.async_schedule_save()
+    
+    def cancel_delay_off():
+        """Cancel a pending delayed turn-off."""
+        resources.untrack("delay_off")
+        state_data["delay_off_deadline"] = None
+    
+    def schedule_delay_off(delay):
+        """Check again after a delay and turn the lights off unless someone is present."""
+        cancel_delay_off()
         
-        if sensor_type == "presence":
-            # 扩展有人状态列表，增加更多可能的状态值
-            present_states = ["有人", "one", "on", "On", "ON", "True", "true", "TRUE", "1", "2", True, "home", "Home", "HOME", "在家", "occupied", "Occupied"]
-            # 尝试将状态转换为小写进行比较，增加匹配成功率
-            result = state in present_states or str(state).lower() in [str(s).lower() for s in present_states]
-            _LOGGER.info(f"presence模式: 状态={state}, 有人状态列表={present_states}, 判断结果={result}")
-            return result
-        elif sensor_type == "motion":
-            # 扩展无人状态列表
-            absent_states = ["5 Minutes", "无人", "无人移动", "no motion", "no_motion", "idle"]
-            # 尝试将状态转换为小写进行比较
-            result = state not in absent_states and str(state).lower() not in [str(s).lower() for s in absent_states]
-            _LOGGER.info(f"motion模式: 状态={state}, 无人状态列表={absent_states}, 判断结果={result}")
-            return result
+        @callback
+        @profiler.timed("delay_off")
+        def delay_off_expired(_now):
+            resources.discard("delay_off")
+            state_data["delay_off_deadline"] = None
+            try:
+                inputs = snapshot()
+                actions = decide_delay_off_expired(zone, inputs)
+                _LOGGER.info(f"延迟{delay}秒后检查人在状态: {inputs.presence_state}, 动作: {actions}")
+                execute(actions)
+            except Exception as e:
+                _LOGGER.error(f"延迟关灯时出错: {e}", exc_info=True)
         
-        _LOGGER.info(f"未知传感器类型: {sensor_type}, 默认返回False")
-        return False
+        resources.track("delay_off", async_call_later(hass, delay, delay_off_expired))
+        state_data["delay_off_deadline"] = dt_util.utcnow() + timedelta(seconds=delay)
     
-    _LOGGER.info("自动化任务创建完成")
+    def shorten_delay_off():
+        """Shorten a pending delayed turn-off because someone arrived in a neighbor zone.
+        
+        Return True if a delayed turn-off was pending.
+        """
+        pending = state_data.get("delay_off_deadline") is not None
+        execute(decide_handoff(zone, snapshot(), runtime(), dt_util.utcnow()))
+        return pending
     
-    def is_brightness_low(state):
-        """Determine if brightness is low based on sensor state."""
-        _LOGGER.info(f"判断亮度状态: {state}")
-        try:
-            # 处理可能的None值
-            if state is None:
-                _LOGGER.info("亮度状态为None，默认返回False")
-                return False
-                
-            # 处理字符串"None"
-            if state == "None" or state == "unknown" or state == "unavailable":
-                _LOGGER.info(f"亮度状态为特殊值: {state}，默认返回False")
-                return False
-                
-            if sensor_type == "presence":
-                try:
-                    # 尝试将状态转换为数值
-                    brightness_value = float(state)
-                    # 使用配置的亮度阈值
-                    brightness_threshold = hass.data[DOMAIN][entry.entry_id]["config"].get(
-                        "brightness_threshold", 60
-                    )
-                    result = brightness_value < brightness_threshold
-                    _LOGGER.info(f"亮度值: {brightness_value}, 阈值: {brightness_threshold}, 判断结果: {result}")
-                    return result
-                except (ValueError, TypeError):
-                    # 如果无法转换为数值，尝试其他判断方法
-                    _LOGGER.info(f"无法将亮度状态转换为数值: {state}")
-                    
-                    # 检查是否包含表示暗的关键词
-                    dark_keywords = ["dark", "暗", "weak", "low", "dim", "night", "夜间", "黑"]
-                    for keyword in dark_keywords:
-                        if keyword.lower() in str(state).lower():
-                            _LOGGER.info(f"亮度状态包含暗关键词: {keyword}")
-                            return True
-                    
-                    # 默认返回False
-                    return False
-            elif sensor_type == "motion":
-                # 扩展弱光状态列表
-                weak_light_states = ["weak", "Weak", "暗", "dark", "Dark", "dim", "Dim", "low", "Low", "night", "Night"]
-                result = str(state) in weak_light_states or str(state).lower() in [s.lower() for s in weak_light_states]
-                _LOGGER.info(f"亮度状态: {state}, 弱光状态列表: {weak_light_states}, 判断结果: {result}")
-                return result
-                
-            _LOGGER.info(f"未知传感器类型: {sensor_type}, 默认返回False")
-            return False
-        except Exception as e:
-            _LOGGER.error(f"判断亮度时出错: {e}", exc_info=True)
-            return False
+    def prearm():
+        """Turn on the lights ahead of a likely arrival from a neighbor zone."""
+        execute(decide_prearm(zone, snapshot(), runtime(), dt_util.now()))
     
-    _LOGGER.info("自动化任务创建完成")
+    def hand_off_to_neighbors():
+        """Notify neighbor zones of an arrival in this zone.
+        
+        A neighbor that is still waiting to turn off, or that was left only
+        moments ago, is most likely where the person came from, so its
+        delay-off is shortened and it is not pre-armed.
+        """
+        now_utc = dt_util.utcnow()
+        for neighbor_id in zone_graph.neighbors(entry.entry_id):
+            neighbor = hass.data[DOMAIN].get(neighbor_id)
+            if neighbor is None:
+                continue
+            neighbor_state = neighbor["state"]
+            if "shorten_delay_off" in neighbor_state and neighbor_state["shorten_delay_off"]():
+                continue
+            last_departure = neighbor_state.get("last_departure")
+            if (
+                last_departure is not None
+                and (now_utc - last_departure).total_seconds() < PREARM_DEPARTURE_WINDOW
+            ):
+                continue
+            if "prearm" in neighbor_state:
+                neighbor_state["prearm"]()
     
-    def get_active_lights():
-        """Get active lights based on light type and current time."""
-        try:
-            if light_type == "single" or light_type == "multiple_parallel":
-                _LOGGER.info(f"单灯光或多灯光并列模式，返回所有灯光: {lights}")
-                return lights
-            elif light_type == "multiple_alternate":
-                now = datetime.datetime.now()
-                now_hour = now.hour
-                now_minute = now.minute
-                _LOGGER.info(f"多灯光交替模式，当前时间: {now_hour}:{now_minute:02d}, 检查灯光调度")
-                
-                # 记录所有灯光的调度
-                _LOGGER.info(f"灯光调度配置: {light_schedules}")
-                
-                for light_id, schedule in light_schedules.items():
-                    # 提取小时部分
-                    start_hour = int(schedule["start"].split(":")[0])
-                    end_hour = int(schedule["end"].split(":")[0])
-                    
-                    _LOGGER.info(f"检查灯光 {light_id}: 开始时间={start_hour}, 结束时间={end_hour}")
-                    
-                    # 处理相等或跨午夜的情况
-                    if start_hour == end_hour:
-                        # 24小时运行的情况
-                        _LOGGER.info(f"灯光 {light_id} 设置为24小时运行 (开始={start_hour}, 结束={end_hour})")
-                        return [light_id]
-                    elif start_hour < end_hour:
-                        # 正常时间段 (例如 8:00-20:00)
-                        if start_hour <= now_hour < end_hour:
-                            _LOGGER.info(f"匹配到灯光 {light_id}: {start_hour} <= {now_hour} < {end_hour}")
-                            return [light_id]
-                    else:
-                        # 跨午夜时间段 (例如 20:00-8:00)
-                        if now_hour >= start_hour or now_hour < end_hour:
-                            _LOGGER.info(f"匹配到灯光 {light_id}: {now_hour} >= {start_hour} 或 {now_hour} < {end_hour}")
-                            return [light_id]
-                
-                # Default to first light if no schedule matches
-                if light_schedules:
-                    default_light = [next(iter(light_schedules.keys()))]
-                    _LOGGER.info(f"没有匹配的灯光调度，使用默认灯光: {default_light}")
-                    return default_light
-                else:
-                    _LOGGER.warning("没有灯光调度配置，返回空列表")
-                    return []
-            
-            _LOGGER.warning(f"未知灯光类型: {light_type}, 返回空列表")
-            return []
-        except Exception as e:
-            _LOGGER.error(f"获取活跃灯光时出错: {e}", exc_info=True)
-            # 出错时返回所有灯光作为备选
-            _LOGGER.info(f"出错时返回所有灯光作为备选: {lights}")
-            return lights
+    state_data["shorten_delay_off"] = shorten_delay_off
+    state_data["prearm"] = prearm
     
-    async def handle_presence_change(event):
+    @callback
+    @profiler.timed("presence_change")
+    def handle_presence_change(event):
         """Handle changes to the presence sensor."""
         try:
-            # 检查自动化是否启用
-            if not hass.data[DOMAIN][entry.entry_id]["state"].get("enabled", True):
-                _LOGGER.info("自动化当前已禁用，忽略状态变化")
-                return
-                
             new_state = event.data.get("new_state")
             old_state = event.data.get("old_state")
             
-            _LOGGER.info(f"收到状态变化事件: new_state={new_state}, old_state={old_state}")
-            
             if not new_state:
                 _LOGGER.warning("状态变化事件中缺少新状态，忽略此事件")
                 return
-                
-            # 即使没有旧状态也继续处理
-            new_presence = is_person_present(new_state.state)
-            old_presence = is_person_present(old_state.state if old_state else None)
-            
-            _LOGGER.info(f"人在状态变化: 旧状态={old_state.state if old_state else '无'}({old_presence}), 新状态={new_state.state}({new_presence})")
-            _LOGGER.info(f"传感器类型: {sensor_type}, 判断函数: {is_person_present.__name__}")
-            
-            # 如果新旧状态相同，仍然执行逻辑以确保灯光状态正确
-            if new_presence == old_presence:
-                _LOGGER.info(f"人在状态未变化 (仍为 {new_presence})，但仍检查灯光状态")
-                # 检查自动化是否启用
-                if not hass.data[DOMAIN][entry.entry_id]["state"].get("enabled", True):
-                    _LOGGER.info("自动化当前已禁用，忽略状态未变化时的灯光操作")
-                    return
-                if new_presence:
-                    # 人在，检查亮度并决定是否开灯
-                    brightness_state = hass.states.get(brightness_sensor)
-                    if brightness_state and is_brightness_low(brightness_state.state):
-                        _LOGGER.info(f"人在且亮度低，准备开灯")
-                        active_lights = get_active_lights()
-                        for light in active_lights:
-                            if hass.states.is_state(light, STATE_OFF):
-                                _LOGGER.info(f"正在打开灯光: {light}")
-                                await hass.services.async_call(
-                                    LIGHT_DOMAIN, "turn_on", {"entity_id": light}
-                                )
-                else:
-                    # 人不在，关灯
-                    _LOGGER.info("人不在，准备关闭灯光")
-                    for light in lights:
-                        if hass.states.is_state(light, STATE_ON):
-                            _LOGGER.info(f"正在关闭灯光: {light}")
-                            await hass.services.async_call(
-                                LIGHT_DOMAIN, "turn_off", {"entity_id": light}
-                            )
-                return
             
-            # Person left
-            if old_presence and not new_presence:
-                delay_off_time = hass.data[DOMAIN][entry.entry_id]["config"].get(
-                    "delay_off_time", 0
-                )
-                
-                if delay_off_time > 0:
-                    _LOGGER.info(f"检测到人离开，将在{delay_off_time}秒后关闭灯光")
-                    
-                    # 存储延迟关灯任务
-                    if "delay_off_task" not in hass.data[DOMAIN][entry.entry_id]["state"]:
-                        hass.data[DOMAIN][entry.entry_id]["state"]["delay_off_task"] = None
-                    
-                    # 取消之前的延迟任务（如果有）
-                    if hass.data[DOMAIN][entry.entry_id]["state"]["delay_off_task"] is not None:
-                        hass.data[DOMAIN][entry.entry_id]["state"]["delay_off_task"]()
-                    
-                    # 创建新的延迟任务
-                    async def delayed_turn_off():
-                        await asyncio.sleep(delay_off_time)
-                        
-                        # 检查是否仍然没有人
-                        presence_state = hass.states.get(presence_sensor)
-                        if presence_state:
-                            is_present = is_person_present(presence_state.state)
-                            _LOGGER.info(f"延迟{delay_off_time}秒后检查人在状态: {presence_state.state}, 判断结果={is_present}")
-                            
-                            if not is_present:
-                                _LOGGER.info(f"确认无人在场，现在关闭灯光")
-                                for light in lights:
-                                    if hass.states.is_state(light, STATE_ON):
-                                        _LOGGER.info(f"正在关闭灯光: {light}")
-                                        await hass.services.async_call(
-                                            LIGHT_DOMAIN, "turn_off", {"entity_id": light}
-                                        )
-                            else:
-                                _LOGGER.info(f"检测到人已返回，取消关灯操作")
-                        
-                        # 清除任务引用
-                        hass.data[DOMAIN][entry.entry_id]["state"]["delay_off_task"] = None
-                    
-                    hass.data[DOMAIN][entry.entry_id]["state"]["delay_off_task"] = hass.async_create_task(delayed_turn_off())
-                else:
-                    _LOGGER.info("检测到人离开，立即关闭灯光")
-                    for light in lights:
-                        if hass.states.is_state(light, STATE_ON):
-                            _LOGGER.info(f"正在关闭灯光: {light}")
-                            await hass.services.async_call(
-                                LIGHT_DOMAIN, "turn_off", {"entity_id": light}
-                            )
-            
-            # Person arrived
-            elif not old_presence and new_presence:
-                _LOGGER.info("检测到人到达，准备检查亮度并开灯")
-                brightness_state = hass.states.get(brightness_sensor)
-                if brightness_state and is_brightness_low(brightness_state.state):
-                    _LOGGER.info(f"亮度低，准备开灯")
-                    active_lights = get_active_lights()
-                    for light in active_lights:
-                        if hass.states.is_state(light, STATE_OFF):
-                            _LOGGER.info(f"正在打开灯光: {light}")
-                            await hass.services.async_call(
-                                LIGHT_DOMAIN, "turn_on", {"entity_id": light}
-                            )
+            observe_state(ROLE_PRESENCE, new_state)
+            inputs = snapshot(new_state)
+            actions = decide_presence_change(
+                zone, inputs, runtime(), old_state.state if old_state else None, dt_util.now()
+            )
+            _LOGGER.info(f"人在状态变化: 旧状态={old_state.state if old_state else '无'}, 新状态={new_state.state}, 动作: {actions}")
+            execute(actions)
         except Exception as e:
             _LOGGER.error(f"处理人在状态变化时出错: {e}", exc_info=True)
     
-    async def periodic_check(now=None):
+    @callback
+    def handle_brightness_change(event):
+        """Record updates of the brightness sensor for freshness tracking."""
+        new_state = event.data.get("new_state")
+        brightness_tracker.observe(new_state)
+        observe_state(ROLE_BRIGHTNESS, new_state)
+    
+    @callback
+    @profiler.timed("light_change")
+    def handle_light_change(event):
+        """Update the light cache and energy meter, and learn from manual corrections."""
+        new_state = event.data.get("new_state")
+        old_state = event.data.get("old_state")
+        light_cache.update(event.data["entity_id"], new_state.state if new_state else None)
+        energy_meter.observe_light(
+            event.data["entity_id"], new_state.state if new_state else None, dt_util.utcnow()
+        )
+        if tuner_store is None:
+            return
+        if new_state is None or old_state is None or new_state.state == old_state.state:
+            return
+        if actuation_queue.is_own_context(new_state.context):
+            return
+        last_decision = state_data.get("last_decision")
+        if last_decision is None:
+            return
+        action, decided_at, lux = last_decision
+        if (dt_util.utcnow() - decided_at).total_seconds() > MANUAL_OVERRIDE_WINDOW:
+            return
+        if new_state.state == STATE_ON and action == ACTION_SKIP_BRIGHT:
+            _LOGGER.info(f"检测到手动开灯 {new_state.entity_id}，亮度 {lux} 时需要灯光")
+            tuner_store.tuner.observe_manual_on(lux)
+        elif new_state.state == STATE_OFF and action == ACTION_TURN_ON:
+            _LOGGER.info(f"检测到手动关灯 {new_state.entity_id}，亮度 {lux} 时不需要灯光")
+            tuner_store.tuner.observe_manual_off(lux)
+        else:
+            return
+        tuner_store.async_schedule_save()
+    
+    @callback
+    def apply_tuning(now=None):
+        """Apply the learned threshold and delay-off time to the running config."""
+        nonlocal zone
+        applied = {}
+        threshold = tuner_store.tuner.suggest_threshold()
+        if threshold is not None:
+            applied[CONF_BRIGHTNESS_THRESHOLD] = threshold
+        delay_off_time = tuner_store.tuner.suggest_delay_off()
+        if delay_off_time is not None:
+            applied[CONF_DELAY_OFF_TIME] = delay_off_time
+        if applied and applied != tuner_store.tuner.applied:
+            _LOGGER.info(f"自动调优参数: {applied}")
+            data.update(applied)
+            zone = ZoneConfig(data, brightness_kind)
+            tuner_store.tuner.apply(applied, entry.data)
+            tuner_store.async_schedule_save()
+    
+    @callback
+    @profiler.timed("periodic_check")
+    def periodic_check(now=None):
         """Run periodic check to ensure automation logic is applied."""
         try:
-            # 检查自动化是否启用
-            if not hass.data[DOMAIN][entry.entry_id]["state"].get("enabled", True):
-                _LOGGER.info("自动化当前已禁用，跳过定期检查")
-                return
-                
-            _LOGGER.info(f"执行定期检查 (时间: {now})")
-            
-            presence_state = hass.states.get(presence_sensor)
-            brightness_state = hass.states.get(brightness_sensor)
-            
-            if not presence_state:
-                return
-                
-            if not brightness_state:
-                return
-                
-            is_present = is_person_present(presence_state.state)
-            is_dark = is_brightness_low(brightness_state.state)
-            
-            _LOGGER.info(f"定期检查: 人在状态={presence_state.state}({is_present}), 亮度状态={brightness_state.state}({is_dark})")
-            
-            # 获取当前活跃的灯光
-            active_lights = get_active_lights()
-            _LOGGER.info(f"当前活跃灯光: {active_lights}")
-            
-            # 检查当前灯光状态
-            for light in lights:
-                light_state = hass.states.get(light)
-                if light_state:
-                    _LOGGER.info(f"灯光 {light} 当前状态: {light_state.state}")
-                else:
-                    _LOGGER.info(f"无法获取灯光 {light} 的状态")
-            
-            # If person is present and it's dark, turn on lights
-            if is_present and is_dark:
-                _LOGGER.info("人在且亮度低，准备开灯")
-                for light in active_lights:
-                    if hass.states.is_state(light, STATE_OFF):
-                        _LOGGER.info(f"正在打开灯光: {light}")
-                        await hass.services.async_call(
-                            LIGHT_DOMAIN, "turn_on", {"entity_id": light}
-                        )
-            
-            # If no one is present, turn off lights
-            elif not is_present:
-                _LOGGER.info("人不在，准备关闭灯光")
-                for light in lights:
-                    if hass.states.is_state(light, STATE_ON):
-                        _LOGGER.info(f"正在关闭灯光: {light}")
-                        await hass.services.async_call(
-                            LIGHT_DOMAIN, "turn_off", {"entity_id": light}
-                        )
-            else:
-                _LOGGER.info(f"当前状态不需要操作灯光: 人在={is_present}, 亮度低={is_dark}")
+            inputs = snapshot()
+            actions = decide_periodic(zone, inputs, runtime(), dt_util.now())
+            _LOGGER.info(
+                f"定期检查 (时间: {now}): 人在状态={inputs.presence_state}, 亮度状态={inputs.brightness_state}, "
+                f"灯光 开/关/不可用={light_cache.on_count}/{light_cache.off_count}/{light_cache.unavailable_count}, 动作: {actions}"
+            )
+            execute(actions)
+            energy_meter.refresh()
         except Exception as e:
             _LOGGER.error(f"定期检查时出错: {e}", exc_info=True)
     
+    @callback
+    def reset_energy(now=None):
+        """Start a new day of energy accounting."""
+        energy_meter.reset(dt_util.utcnow())
+    
     # Register state change listener
     _LOGGER.info(f"注册状态变化监听器: 传感器={presence_sensor}")
-    hass.data[DOMAIN][entry.entry_id]["state"]["remove_state_listener"] = async_track_state_change_event(
+    resources.track("state_listener", async_track_state_change_event(
         hass, [presence_sensor], handle_presence_change
-    )
+    ))
+    
+    resources.track("brightness_listener", async_track_state_change_event(
+        hass, [brightness_sensor], handle_brightness_change
+    ))
+    
+    resources.track("light_listener", async_track_state_change_event(
+        hass, list(zone.lights), handle_light_change
+    ))
+    
+    if tuner_store is not None and tuning_mode == TUNING_MODE_APPLY:
+        resources.track("tuning_timer", async_track_time_change(
+            hass, apply_tuning, hour=TUNING_APPLY_HOUR, minute=0, second=0
+        ))
+    
+    # 每天零点开始新的能耗统计周期
+    resources.track("energy_reset", async_track_time_change(
+        hass, reset_energy, hour=0, minute=0, second=0
+    ))
     
-    # 立即执行一次状态检查，确保初始状态正确
-    _LOGGER.info("执行初始状态检查")
-    await periodic_check()
+    @callback
+    def initial_check(_now):
+        """Run the first check to make the initial light states match."""
+        resources.discard("initial_check")
+        _LOGGER.info("执行初始状态检查")
+        periodic_check()
+    
+    @callback
+    def schedule_initial_check(_hass):
+        """Schedule the first check without blocking the entry setup."""
+        resources.track("initial_check", async_call_later(hass, 0, initial_check))
+    
+    # Home Assistant 启动完成后再执行初始检查，此时各传感器状态已恢复
+    resources.track("started_listener", async_at_started(hass, schedule_initial_check))
     
     # Register periodic check (every 10 minutes)
-    hass.data[DOMAIN][entry.entry_id]["state"]["remove_interval"] = async_track_time_interval(
+    resources.track("interval", async_track_time_interval(
         hass, periodic_check, timedelta(minutes=10)
-    )
+    ))
+    
+    _LOGGER.info("自动化任务创建完成")
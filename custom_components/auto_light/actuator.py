@@ -0,0 +1,209 @@
+"""Domain-wide rate limited actuation queue for Auto Light."""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from homeassistant.components.light import DOMAIN as LIGHT_DOMAIN
+from homeassistant.core import Context, HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from .const import (
+    DOMAIN,
+    DATA_ACTUATION_QUEUE,
+    DEFAULT_QUEUE_RATE,
+    DEFAULT_QUEUE_BURST,
+)
+from .profiling import Profiler, get_profiler
+
+_LOGGER = logging.getLogger(__name__)
+
+# 开灯（有人到达）优先于关灯（有人离开）
+SERVICE_PRIORITIES = {
+    "turn_on": 0,
+    "turn_off": 1,
+}
+
+# 无法识别所属集成的实体归入此桥接
+UNKNOWN_BRIDGE = "unknown"
+
+# 记录最近发出命令的上下文数量，用于区分手动操作
+OWN_CONTEXT_HISTORY = 256
+
+
+class TokenBucket:
+    """Token bucket limiting the call rate of one bridge."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        """Initialize the bucket, starting full."""
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens accrued since the last refill."""
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, now: float) -> bool:
+        """Take one token if available."""
+        self._refill(now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now: float) -> float:
+        """Return the seconds until the next token is available."""
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class ActuationQueue:
+    """Queue light service calls from all entries, merged per light and rate limited per bridge."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        rate: float = DEFAULT_QUEUE_RATE,
+        burst: int = DEFAULT_QUEUE_BURST,
+        profiler: Optional[Profiler] = None,
+    ) -> None:
+        """Initialize the queue."""
+        self._hass = hass
+        self._profiler = profiler if profiler is not None else Profiler()
+        self._rate = rate
+        self._burst = burst
+        self._counter = itertools.count()
+        # 每个灯光只保留最新的一条待执行命令: entity_id -> (序号, 服务, 数据, 入队时间)
+        self._pending: Dict[str, Tuple[int, str, Dict[str, Any], float]] = {}
+        # 每个桥接一个优先级堆: bridge -> [(优先级, 序号, entity_id)]
+        self._heaps: Dict[str, List[Tuple[int, int, str]]] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._bridges: Dict[str, str] = {}
+        self._drain_task: Optional[asyncio.Task] = None
+        self._own_context_ids: deque = deque(maxlen=OWN_CONTEXT_HISTORY)
+        self.merged_count = 0
+        self.sent_count = 0
+
+    def _bridge_for(self, entity_id: str) -> str:
+        """Return the integration that owns the entity, cached per entity."""
+        bridge = self._bridges.get(entity_id)
+        if bridge is None:
+            entry = er.async_get(self._hass).async_get(entity_id)
+            bridge = entry.platform if entry is not None else UNKNOWN_BRIDGE
+            self._bridges[entity_id] = bridge
+        return bridge
+
+    def async_enqueue(
+        self, entity_id: str, service: str, data: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Queue a light service call, replacing any queued call for the same light."""
+        seq = next(self._counter)
+        if entity_id in self._pending:
+            self.merged_count += 1
+            _LOGGER.info(f"合并灯光 {entity_id} 的排队命令: {self._pending[entity_id][1]} -> {service}")
+        self._pending[entity_id] = (seq, service, data or {}, time.monotonic())
+
+        bridge = self._bridge_for(entity_id)
+        priority = SERVICE_PRIORITIES.get(service, len(SERVICE_PRIORITIES))
+        heapq.heappush(self._heaps.setdefault(bridge, []), (priority, seq, entity_id))
+
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = self._hass.async_create_task(self._async_drain())
+
+    def _has_ready(self, bridge: str) -> bool:
+        """Drop superseded entries from the top of a bridge's heap; True if a live command remains."""
+        heap = self._heaps[bridge]
+        while heap:
+            _, seq, entity_id = heap[0]
+            pending = self._pending.get(entity_id)
+            if pending is not None and pending[0] == seq:
+                return True
+            heapq.heappop(heap)
+        return False
+
+    def _pop_ready(self, bridge: str) -> Tuple[str, str, Dict[str, Any], float]:
+        """Pop the live command on top of a bridge's heap; call after ``_has_ready``."""
+        _, _, entity_id = heapq.heappop(self._heaps[bridge])
+        pending = self._pending.pop(entity_id)
+        return entity_id, pending[1], pending[2], pending[3]
+
+    async def _async_drain(self) -> None:
+        """Send queued calls as fast as each bridge's bucket allows."""
+        while self._pending:
+            now = time.monotonic()
+            wait = None
+            for bridge in list(self._heaps):
+                bucket = self._buckets.setdefault(bridge, TokenBucket(self._rate, self._burst))
+                # 先丢弃已被替换的条目，只有确实要发送命令时才消耗令牌
+                while self._has_ready(bridge):
+                    if not bucket.try_acquire(now):
+                        bridge_wait = bucket.wait_time(now)
+                        wait = bridge_wait if wait is None else min(wait, bridge_wait)
+                        break
+                    await self._async_send(*self._pop_ready(bridge))
+                if not self._heaps[bridge]:
+                    del self._heaps[bridge]
+            if wait is not None:
+                await asyncio.sleep(wait)
+
+    async def _async_send(
+        self, entity_id: str, service: str, data: Dict[str, Any], enqueued: float
+    ) -> None:
+        """Send one service call."""
+        _LOGGER.info(f"执行排队命令: {service} {entity_id}")
+        self.sent_count += 1
+        context = Context()
+        self._own_context_ids.append(context.id)
+        profiling = self._profiler.enabled
+        if profiling:
+            # 记录命令在队列中的等待时间（含限流）和服务调用本身的耗时
+            start = time.perf_counter()
+            self._profiler.observe("queue_wait", time.monotonic() - enqueued)
+        try:
+            await self._hass.services.async_call(
+                LIGHT_DOMAIN, service, {"entity_id": entity_id, **data}, context=context
+            )
+        except Exception as e:
+            _LOGGER.error(f"执行灯光命令 {service} {entity_id} 时出错: {e}", exc_info=True)
+        finally:
+            if profiling:
+                self._profiler.observe(f"service_{service}", time.perf_counter() - start)
+
+    def is_own_context(self, context: Optional[Context]) -> bool:
+        """Return True if a state change was caused by a queued command."""
+        return context is not None and context.id in self._own_context_ids
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return a diagnostics summary of the queue."""
+        return {
+            "pending": len(self._pending),
+            "sent": self.sent_count,
+            "merged": self.merged_count,
+            "bridges": sorted(set(self._bridges.values())),
+        }
+
+    def async_cancel(self) -> None:
+        """Drop all queued calls and stop draining."""
+        self._pending.clear()
+        self._heaps.clear()
+        if self._drain_task is not None and not self._drain_task.done():
+            self._drain_task.cancel()
+        self._drain_task = None
+
+
+def get_actuation_queue(hass: HomeAssistant) -> ActuationQueue:
+    """Return the domain-wide actuation queue, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    queue = domain_data.get(DATA_ACTUATION_QUEUE)
+    if queue is None:
+        queue = ActuationQueue(hass, profiler=get_profiler(hass))
+        domain_data[DATA_ACTUATION_QUEUE] = queue
+    return queue
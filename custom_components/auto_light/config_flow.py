@@ -18,6 +18,7 @@ from homeassistant.helpers.selector import (
     TextSelector,
     TextSelectorConfig,
     TimeSelector,
+    ObjectSelector,
 )
 
 from .const import (
@@ -39,7 +40,39 @@ from .const import (
     CONF_DELAY_OFF_TIME,
     DEFAULT_BRIGHTNESS_THRESHOLD,
     DEFAULT_DELAY_OFF_TIME,
+    CONF_SUN_FALLBACK,
+    CONF_BRIGHTNESS_MAX_AGE,
+    DEFAULT_SUN_FALLBACK,
+    DEFAULT_BRIGHTNESS_MAX_AGE,
+    CONF_PRESENCE_MAX_AGE,
+    CONF_STALE_POLICY,
+    DEFAULT_PRESENCE_MAX_AGE,
+    DEFAULT_STALE_POLICY,
+    STALE_POLICY_USE,
+    STALE_POLICY_IGNORE,
+    STALE_POLICY_FALLBACK,
+    CONF_TIMELINE_DAYS,
+    DEFAULT_TIMELINE_DAYS,
+    CONF_TUNING_MODE,
+    DEFAULT_TUNING_MODE,
+    TUNING_MODE_OFF,
+    TUNING_MODE_SUGGEST,
+    TUNING_MODE_APPLY,
+    CONF_NEIGHBORS,
+    CONF_HANDOFF_DELAY_OFF,
+    DEFAULT_HANDOFF_DELAY_OFF,
+    CONF_SEGMENTS,
+    CONF_LIGHT_WATTAGE,
+    DEFAULT_LIGHT_WATTAGE,
+    CONF_PRESENT_STATES,
+    CONF_ABSENT_STATES,
+    CONF_DARK_STATES,
+    CONF_OBSERVE_STATES,
+    DEFAULT_OBSERVE_STATES,
 )
+from .energy import validate_wattage
+from .schedule import validate_segments
+from .vocabulary import ROLE_PRESENCE, ROLE_BRIGHTNESS
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -54,6 +87,80 @@ LIGHT_TYPES = [
     {"value": LIGHT_TYPE_MULTIPLE_ALTERNATE, "label": "多灯光交替"},
 ]
 
+STALE_POLICIES = [
+    {"value": STALE_POLICY_FALLBACK, "label": "使用备用估算"},
+    {"value": STALE_POLICY_IGNORE, "label": "忽略过期读数"},
+    {"value": STALE_POLICY_USE, "label": "继续使用"},
+]
+
+TUNING_MODES = [
+    {"value": TUNING_MODE_OFF, "label": "关闭"},
+    {"value": TUNING_MODE_SUGGEST, "label": "仅建议"},
+    {"value": TUNING_MODE_APPLY, "label": "自动应用"},
+]
+
+def _neighbor_options(
+    hass: HomeAssistant, exclude_entry_id: Optional[str] = None
+) -> List[Dict[str, str]]:
+    """Return the other Auto Light entries that can be selected as neighbors."""
+    return [
+        {"value": entry.entry_id, "label": entry.title}
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.entry_id != exclude_entry_id
+    ]
+
+def _validate_segments_input(
+    user_input: Dict[str, Any], lights: List[str], errors: Dict[str, str]
+) -> List[Dict[str, Any]]:
+    """Validate the multi-segment schedule field, recording an error if it is invalid."""
+    try:
+        return validate_segments(user_input.get(CONF_SEGMENTS) or [], lights)
+    except (ValueError, KeyError, TypeError) as e:
+        _LOGGER.warning(f"多段作息配置无效: {e}")
+        errors[CONF_SEGMENTS] = "invalid_segments"
+        return []
+
+def _validate_wattage_input(
+    user_input: Dict[str, Any], lights: List[str], errors: Dict[str, str]
+) -> Dict[str, float]:
+    """Validate the per-light wattage field, recording an error if it is invalid."""
+    try:
+        return validate_wattage(user_input.get(CONF_LIGHT_WATTAGE) or {}, lights)
+    except (ValueError, TypeError) as e:
+        _LOGGER.warning(f"灯光功率配置无效: {e}")
+        errors[CONF_LIGHT_WATTAGE] = "invalid_wattage"
+        return {}
+
+def _state_selector(options: List[str]) -> SelectSelector:
+    """Return a selector for a list of free-form sensor states."""
+    return SelectSelector(
+        SelectSelectorConfig(
+            options=options,
+            multiple=True,
+            custom_value=True,
+            mode=SelectSelectorMode.DROPDOWN,
+        )
+    )
+
+def _state_fields(data: Dict[str, Any], observed: Dict[str, List[str]]) -> Dict[Any, Any]:
+    """Return the fields of the entry-specific state vocabularies.
+    
+    ``observed`` maps each field to the states seen in observation mode,
+    offered as options next to the configured ones.
+    """
+    fields = {}
+    for key in (CONF_PRESENT_STATES, CONF_ABSENT_STATES, CONF_DARK_STATES):
+        configured = data.get(key, [])
+        options = list(dict.fromkeys([*configured, *observed.get(key, [])]))
+        fields[vol.Optional(key, default=configured)] = _state_selector(options)
+    fields[
+        vol.Required(
+            CONF_OBSERVE_STATES,
+            default=data.get(CONF_OBSERVE_STATES, DEFAULT_OBSERVE_STATES)
+        )
+    ] = bool
+    return fields
+
 async def _validate_light_schedules(
     hass: HomeAssistant, light_schedules: Dict[str, Dict[str, str]]
 ) -> bool:
@@ -404,8 +511,26 @@ class AutoLightConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         errors = {}
         
         if user_input is not None:
+            segments = _validate_segments_input(user_input, self._data[CONF_LIGHTS], errors)
+            wattage = _validate_wattage_input(user_input, self._data[CONF_LIGHTS], errors)
+        
+        if user_input is not None and not errors:
             self._data[CONF_BRIGHTNESS_THRESHOLD] = user_input[CONF_BRIGHTNESS_THRESHOLD]
             self._data[CONF_DELAY_OFF_TIME] = user_input[CONF_DELAY_OFF_TIME]
+            self._data[CONF_SUN_FALLBACK] = user_input[CONF_SUN_FALLBACK]
+            self._data[CONF_BRIGHTNESS_MAX_AGE] = user_input[CONF_BRIGHTNESS_MAX_AGE]
+            self._data[CONF_PRESENCE_MAX_AGE] = user_input[CONF_PRESENCE_MAX_AGE]
+            self._data[CONF_STALE_POLICY] = user_input[CONF_STALE_POLICY]
+            self._data[CONF_TIMELINE_DAYS] = user_input[CONF_TIMELINE_DAYS]
+            self._data[CONF_TUNING_MODE] = user_input[CONF_TUNING_MODE]
+            self._data[CONF_HANDOFF_DELAY_OFF] = user_input[CONF_HANDOFF_DELAY_OFF]
+            self._data[CONF_NEIGHBORS] = user_input.get(CONF_NEIGHBORS, [])
+            self._data[CONF_LIGHT_WATTAGE] = wattage
+            for key in (CONF_PRESENT_STATES, CONF_ABSENT_STATES, CONF_DARK_STATES):
+                self._data[key] = user_input.get(key, [])
+            self._data[CONF_OBSERVE_STATES] = user_input[CONF_OBSERVE_STATES]
+            if self._data[CONF_LIGHT_TYPE] == LIGHT_TYPE_MULTIPLE_ALTERNATE:
+                self._data[CONF_SEGMENTS] = segments
             return await self.async_step_name()
         
         schema = vol.Schema(
@@ -418,9 +543,85 @@ class AutoLightConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     CONF_DELAY_OFF_TIME,
                     default=DEFAULT_DELAY_OFF_TIME
                 ): cv.positive_int,
+                vol.Required(
+                    CONF_SUN_FALLBACK,
+                    default=DEFAULT_SUN_FALLBACK
+                ): bool,
+                vol.Required(
+                    CONF_BRIGHTNESS_MAX_AGE,
+                    default=DEFAULT_BRIGHTNESS_MAX_AGE
+                ): cv.positive_int,
+                vol.Required(
+                    CONF_PRESENCE_MAX_AGE,
+                    default=DEFAULT_PRESENCE_MAX_AGE
+                ): cv.positive_int,
+                vol.Required(
+                    CONF_STALE_POLICY,
+                    default=DEFAULT_STALE_POLICY
+                ): SelectSelector(
+                    SelectSelectorConfig(
+                        options=STALE_POLICIES,
+                        mode=SelectSelectorMode.DROPDOWN,
+                        translation_key="stale_policy",
+                    )
+                ),
+                vol.Required(
+                    CONF_TIMELINE_DAYS,
+                    default=DEFAULT_TIMELINE_DAYS
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=90)),
+                vol.Required(
+                    CONF_TUNING_MODE,
+                    default=DEFAULT_TUNING_MODE
+                ): SelectSelector(
+                    SelectSelectorConfig(
+                        options=TUNING_MODES,
+                        mode=SelectSelectorMode.DROPDOWN,
+                        translation_key="tuning_mode",
+                    )
+                ),
+                vol.Required(
+                    CONF_HANDOFF_DELAY_OFF,
+                    default=DEFAULT_HANDOFF_DELAY_OFF
+                ): cv.positive_int,
+            }
+        )
+        
+        # 选择相邻区域（需要已有其他灯光自动化条目）
+        neighbor_options = _neighbor_options(self.hass)
+        if neighbor_options:
+            schema = schema.extend(
+                {
+                    vol.Optional(CONF_NEIGHBORS, default=[]): SelectSelector(
+                        SelectSelectorConfig(
+                            options=neighbor_options,
+                            multiple=True,
+                            mode=SelectSelectorMode.DROPDOWN,
+                        )
+                    ),
+                }
+            )
+        
+        # 自定义状态映射（在内置状态基础上补充）
+        schema = schema.extend(_state_fields(self._data, {}))
+        
+        # 各灯光的功率（瓦），用于估算能耗
+        schema = schema.extend(
+            {
+                vol.Optional(
+                    CONF_LIGHT_WATTAGE,
+                    default={light: DEFAULT_LIGHT_WATTAGE for light in self._data[CONF_LIGHTS]}
+                ): ObjectSelector(),
             }
         )
         
+        # 多灯交替模式可配置多段作息（每段可包含多个灯光及亮度、色温，区分工作日和周末）
+        if self._data[CONF_LIGHT_TYPE] == LIGHT_TYPE_MULTIPLE_ALTERNATE:
+            schema = schema.extend(
+                {
+                    vol.Optional(CONF_SEGMENTS, default=[]): ObjectSelector(),
+                }
+            )
+        
         return self.async_show_form(
             step_id="advanced",
             data_schema=schema,
@@ -476,9 +677,27 @@ class AutoLightOptionsFlow(config_entries.OptionsFlow):
         errors = {}
         
         if user_input is not None:
+            segments = _validate_segments_input(user_input, self._data[CONF_LIGHTS], errors)
+            wattage = _validate_wattage_input(user_input, self._data[CONF_LIGHTS], errors)
+        
+        if user_input is not None and not errors:
             # 更新配置
             self._data[CONF_BRIGHTNESS_THRESHOLD] = user_input[CONF_BRIGHTNESS_THRESHOLD]
             self._data[CONF_DELAY_OFF_TIME] = user_input[CONF_DELAY_OFF_TIME]
+            self._data[CONF_SUN_FALLBACK] = user_input[CONF_SUN_FALLBACK]
+            self._data[CONF_BRIGHTNESS_MAX_AGE] = user_input[CONF_BRIGHTNESS_MAX_AGE]
+            self._data[CONF_PRESENCE_MAX_AGE] = user_input[CONF_PRESENCE_MAX_AGE]
+            self._data[CONF_STALE_POLICY] = user_input[CONF_STALE_POLICY]
+            self._data[CONF_TIMELINE_DAYS] = user_input[CONF_TIMELINE_DAYS]
+            self._data[CONF_TUNING_MODE] = user_input[CONF_TUNING_MODE]
+            self._data[CONF_HANDOFF_DELAY_OFF] = user_input[CONF_HANDOFF_DELAY_OFF]
+            self._data[CONF_NEIGHBORS] = user_input.get(CONF_NEIGHBORS, [])
+            self._data[CONF_LIGHT_WATTAGE] = wattage
+            for key in (CONF_PRESENT_STATES, CONF_ABSENT_STATES, CONF_DARK_STATES):
+                self._data[key] = user_input.get(key, [])
+            self._data[CONF_OBSERVE_STATES] = user_input[CONF_OBSERVE_STATES]
+            if self._data[CONF_LIGHT_TYPE] == LIGHT_TYPE_MULTIPLE_ALTERNATE:
+                self._data[CONF_SEGMENTS] = segments
             
             # 更新配置条目
             self.hass.config_entries.async_update_entry(
@@ -501,9 +720,100 @@ class AutoLightOptionsFlow(config_entries.OptionsFlow):
                     CONF_DELAY_OFF_TIME,
                     default=self._data.get(CONF_DELAY_OFF_TIME, DEFAULT_DELAY_OFF_TIME)
                 ): cv.positive_int,
+                vol.Required(
+                    CONF_SUN_FALLBACK,
+                    default=self._data.get(CONF_SUN_FALLBACK, DEFAULT_SUN_FALLBACK)
+                ): bool,
+                vol.Required(
+                    CONF_BRIGHTNESS_MAX_AGE,
+                    default=self._data.get(CONF_BRIGHTNESS_MAX_AGE, DEFAULT_BRIGHTNESS_MAX_AGE)
+                ): cv.positive_int,
+                vol.Required(
+                    CONF_PRESENCE_MAX_AGE,
+                    default=self._data.get(CONF_PRESENCE_MAX_AGE, DEFAULT_PRESENCE_MAX_AGE)
+                ): cv.positive_int,
+                vol.Required(
+                    CONF_STALE_POLICY,
+                    default=self._data.get(CONF_STALE_POLICY, DEFAULT_STALE_POLICY)
+                ): SelectSelector(
+                    SelectSelectorConfig(
+                        options=STALE_POLICIES,
+                        mode=SelectSelectorMode.DROPDOWN,
+                        translation_key="stale_policy",
+                    )
+                ),
+                vol.Required(
+                    CONF_TIMELINE_DAYS,
+                    default=self._data.get(CONF_TIMELINE_DAYS, DEFAULT_TIMELINE_DAYS)
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=90)),
+                vol.Required(
+                    CONF_TUNING_MODE,
+                    default=self._data.get(CONF_TUNING_MODE, DEFAULT_TUNING_MODE)
+                ): SelectSelector(
+                    SelectSelectorConfig(
+                        options=TUNING_MODES,
+                        mode=SelectSelectorMode.DROPDOWN,
+                        translation_key="tuning_mode",
+                    )
+                ),
+                vol.Required(
+                    CONF_HANDOFF_DELAY_OFF,
+                    default=self._data.get(CONF_HANDOFF_DELAY_OFF, DEFAULT_HANDOFF_DELAY_OFF)
+                ): cv.positive_int,
+            }
+        )
+        
+        # 选择相邻区域（需要已有其他灯光自动化条目）
+        neighbor_options = _neighbor_options(self.hass, self._config_entry.entry_id)
+        if neighbor_options:
+            schema = schema.extend(
+                {
+                    vol.Optional(
+                        CONF_NEIGHBORS,
+                        default=self._data.get(CONF_NEIGHBORS, [])
+                    ): SelectSelector(
+                        SelectSelectorConfig(
+                            options=neighbor_options,
+                            multiple=True,
+                            mode=SelectSelectorMode.DROPDOWN,
+                        )
+                    ),
+                }
+            )
+        
+        # 自定义状态映射，观察模式下记录到的状态作为可选项
+        observed = {}
+        entry_data = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
+        if entry_data is not None and "vocabulary" in entry_data["state"]:
+            vocabulary = entry_data["state"]["vocabulary"]
+            observed = {
+                CONF_PRESENT_STATES: vocabulary.states(ROLE_PRESENCE),
+                CONF_ABSENT_STATES: vocabulary.states(ROLE_PRESENCE),
+                CONF_DARK_STATES: vocabulary.states(ROLE_BRIGHTNESS),
+            }
+        schema = schema.extend(_state_fields(self._data, observed))
+        
+        # 各灯光的功率（瓦），用于估算能耗
+        schema = schema.extend(
+            {
+                vol.Optional(
+                    CONF_LIGHT_WATTAGE,
+                    default=self._data.get(
+                        CONF_LIGHT_WATTAGE,
+                        {light: DEFAULT_LIGHT_WATTAGE for light in self._data[CONF_LIGHTS]},
+                    )
+                ): ObjectSelector(),
             }
         )
         
+        # 多灯交替模式可配置多段作息（每段可包含多个灯光及亮度、色温，区分工作日和周末）
+        if self._data[CONF_LIGHT_TYPE] == LIGHT_TYPE_MULTIPLE_ALTERNATE:
+            schema = schema.extend(
+                {
+                    vol.Optional(CONF_SEGMENTS, default=self._data.get(CONF_SEGMENTS, [])): ObjectSelector(),
+                }
+            )
+        
         return self.async_show_form(
             step_id="init",
             data_schema=schema,
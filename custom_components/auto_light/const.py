@@ -2,6 +2,16 @@
 
 DOMAIN = "auto_light"
 
+# Domain-wide data keys
+DATA_ACTUATION_QUEUE = "actuation_queue"
+DATA_ZONE_GRAPH = "zone_graph"
+DATA_PROFILER = "profiler"
+DATA_SOLAR_ESTIMATOR = "solar_estimator"
+
+# Light states, kept free of Home Assistant imports for the pure modules
+STATE_ON = "on"
+STATE_OFF = "off"
+
 # Sensor types
 SENSOR_TYPE_PRESENCE = "presence"
 SENSOR_TYPE_MOTION = "motion"
@@ -21,8 +31,90 @@ CONF_LIGHT_SCHEDULES = "light_schedules"
 CONF_NAME = "name"
 CONF_BRIGHTNESS_THRESHOLD = "brightness_threshold"
 CONF_DELAY_OFF_TIME = "delay_off_time"
+CONF_SUN_FALLBACK = "sun_fallback"
+CONF_BRIGHTNESS_MAX_AGE = "brightness_max_age"
+CONF_PRESENCE_MAX_AGE = "presence_max_age"
+CONF_STALE_POLICY = "stale_policy"
+CONF_TIMELINE_DAYS = "timeline_days"
+CONF_TUNING_MODE = "tuning_mode"
+CONF_NEIGHBORS = "neighbors"
+CONF_HANDOFF_DELAY_OFF = "handoff_delay_off"
+CONF_SEGMENTS = "segments"
+CONF_LIGHT_WATTAGE = "light_wattage"
+CONF_PRESENT_STATES = "present_states"
+CONF_ABSENT_STATES = "absent_states"
+CONF_DARK_STATES = "dark_states"
+CONF_OBSERVE_STATES = "observe_states"
+
+# Stale input policies
+STALE_POLICY_USE = "use"
+STALE_POLICY_IGNORE = "ignore"
+STALE_POLICY_FALLBACK = "fallback"
+
+# Tuning modes
+TUNING_MODE_OFF = "off"
+TUNING_MODE_SUGGEST = "suggest"
+TUNING_MODE_APPLY = "apply"
+
+# Schedule segment profiles
+SEGMENT_PROFILE_ALL = "all"
+SEGMENT_PROFILE_WEEKDAY = "weekday"
+SEGMENT_PROFILE_WEEKEND = "weekend"
+
+# How brightness sensor states are compared, detected at setup
+BRIGHTNESS_KIND_AUTO = "auto"
+BRIGHTNESS_KIND_NUMERIC = "numeric"
+BRIGHTNESS_KIND_ENUM = "enum"
+BRIGHTNESS_KIND_BINARY = "binary"
 
 # Default values
 DEFAULT_NAME = "灯光自动化"
 DEFAULT_BRIGHTNESS_THRESHOLD = 60
 DEFAULT_DELAY_OFF_TIME = 0
+DEFAULT_SUN_FALLBACK = True
+DEFAULT_BRIGHTNESS_MAX_AGE = 0
+DEFAULT_PRESENCE_MAX_AGE = 0
+DEFAULT_STALE_POLICY = STALE_POLICY_FALLBACK
+DEFAULT_TIMELINE_DAYS = 7
+DEFAULT_TUNING_MODE = TUNING_MODE_OFF
+DEFAULT_HANDOFF_DELAY_OFF = 5
+DEFAULT_OBSERVE_STATES = False
+# 未配置功率的灯光按此功率（瓦）估算能耗
+DEFAULT_LIGHT_WATTAGE = 10
+
+# 室内照度约为室外照度的比例（采光系数）
+DEFAULT_DAYLIGHT_FACTOR = 0.02
+
+# 每个桥接（集成）每秒允许的服务调用数及突发上限
+DEFAULT_QUEUE_RATE = 5
+DEFAULT_QUEUE_BURST = 10
+
+# 人在时间线每天预留的记录条数，事件频繁时按需扩容到上限
+TIMELINE_RECORDS_PER_DAY = 288
+TIMELINE_MAX_RECORDS_PER_DAY = 2880
+
+# 自动化决策后多久内的灯光手动操作视为对该决策的纠正（秒）
+MANUAL_OVERRIDE_WINDOW = 300
+# 每天应用调优参数的时间（小时）
+TUNING_APPLY_HOUR = 4
+
+# 相邻区域预开灯后等待人到达的时间（秒）
+PREARM_TIMEOUT = 60
+# 相邻区域在此时间内（秒）刚有人离开时不为其预开灯，人多半是从那里过来的
+PREARM_DEPARTURE_WINDOW = 60
+
+# Decision actions recorded in the occupancy timeline
+ACTION_NONE = 0
+ACTION_TURN_ON = 1
+ACTION_TURN_OFF = 2
+ACTION_DELAY_OFF = 3
+ACTION_CANCEL_OFF = 4
+ACTION_SKIP_DISABLED = 5
+ACTION_SKIP_BRIGHT = 6
+ACTION_SKIP_STALE = 7
+ACTION_PREARM = 8
+ACTION_HANDOFF = 9
+
+# Services
+SERVICE_GET_TIMELINE = "get_timeline"
+SERVICE_PROFILE = "profile"
@@ -0,0 +1,488 @@
+"""Pure decision core for Auto Light.
+
+Everything in this module is free of Home Assistant I/O: the async shell in
+``__init__.py`` takes a snapshot of the inputs, calls one of the ``decide_*``
+functions and executes the returned actions. The same functions can be fed
+recorded event streams for replay and regression testing.
+"""
+import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .const import (
+    CONF_SENSOR_TYPE,
+    CONF_LIGHT_TYPE,
+    CONF_LIGHTS,
+    CONF_LIGHT_SCHEDULES,
+    CONF_BRIGHTNESS_THRESHOLD,
+    CONF_DELAY_OFF_TIME,
+    CONF_SUN_FALLBACK,
+    CONF_BRIGHTNESS_MAX_AGE,
+    CONF_PRESENCE_MAX_AGE,
+    CONF_STALE_POLICY,
+    CONF_HANDOFF_DELAY_OFF,
+    CONF_SEGMENTS,
+    CONF_PRESENT_STATES,
+    CONF_ABSENT_STATES,
+    CONF_DARK_STATES,
+    DEFAULT_BRIGHTNESS_THRESHOLD,
+    DEFAULT_DELAY_OFF_TIME,
+    DEFAULT_SUN_FALLBACK,
+    DEFAULT_BRIGHTNESS_MAX_AGE,
+    DEFAULT_PRESENCE_MAX_AGE,
+    DEFAULT_STALE_POLICY,
+    DEFAULT_HANDOFF_DELAY_OFF,
+    SENSOR_TYPE_PRESENCE,
+    SENSOR_TYPE_MOTION,
+    LIGHT_TYPE_SINGLE,
+    LIGHT_TYPE_MULTIPLE_PARALLEL,
+    LIGHT_TYPE_MULTIPLE_ALTERNATE,
+    STALE_POLICY_USE,
+    STALE_POLICY_IGNORE,
+    BRIGHTNESS_KIND_AUTO,
+    BRIGHTNESS_KIND_NUMERIC,
+    BRIGHTNESS_KIND_ENUM,
+    BRIGHTNESS_KIND_BINARY,
+    PREARM_TIMEOUT,
+    ACTION_TURN_ON,
+    ACTION_TURN_OFF,
+    ACTION_DELAY_OFF,
+    ACTION_CANCEL_OFF,
+    ACTION_SKIP_DISABLED,
+    ACTION_SKIP_BRIGHT,
+    ACTION_SKIP_STALE,
+    ACTION_PREARM,
+    ACTION_HANDOFF,
+    STATE_ON,
+    STATE_OFF,
+)
+from .schedule import Segment, WeekSchedule
+from .solar import blend_lux
+
+# 扩展有人状态列表，增加更多可能的状态值
+PRESENT_STATES = ["有人", "one", "on", "On", "ON", "True", "true", "TRUE", "1", "2", True, "home", "Home", "HOME", "在家", "occupied", "Occupied"]
+# 扩展无人状态列表
+ABSENT_STATES = ["5 Minutes", "无人", "无人移动", "no motion", "no_motion", "idle"]
+# 扩展弱光状态列表（精确匹配，不区分大小写；其他取值可在条目中自定义）
+WEAK_LIGHT_STATES = ["weak", "暗", "dark", "dim", "low", "night", "夜间", "黑", "较暗", "很暗", "昏暗", "黑暗", "darkness", "low_light"]
+
+# 亮度传感器的无效状态
+INVALID_STATES = (None, "None", "unknown", "unavailable")
+
+# 数值亮度传感器的设备类别；光线二元传感器 on 表示检测到光线
+ILLUMINANCE_DEVICE_CLASS = "illuminance"
+ENUM_DEVICE_CLASS = "enum"
+BINARY_SENSOR_DOMAIN = "binary_sensor"
+
+
+def _compile_states(builtin: List[Any], custom: Optional[List[str]]) -> frozenset:
+    """Return the lowercase set of built-in and entry-specific states."""
+    return frozenset(str(s).lower() for s in [*builtin, *(custom or [])])
+
+
+class ZoneConfig:
+    """Decision parameters of one zone, compiled once from the entry config."""
+
+    def __init__(self, data: Dict[str, Any], brightness_kind: str = BRIGHTNESS_KIND_AUTO) -> None:
+        """Compile the entry config.
+
+        ``brightness_kind`` selects how brightness states are compared; see
+        ``detect_brightness_kind``.
+        """
+        self.sensor_type = data.get(CONF_SENSOR_TYPE)
+        self.light_type = data.get(CONF_LIGHT_TYPE)
+        self.lights: Tuple[str, ...] = tuple(data.get(CONF_LIGHTS, []))
+        # 多灯交替模式按每周分钟预编译时间段索引，优先使用多段作息配置
+        self.segment: Optional[Segment] = None
+        self.schedule: Optional[WeekSchedule] = None
+        if self.light_type == LIGHT_TYPE_MULTIPLE_ALTERNATE:
+            if data.get(CONF_SEGMENTS):
+                self.schedule = WeekSchedule.from_segments(data[CONF_SEGMENTS])
+            else:
+                self.schedule = WeekSchedule.from_light_schedules(
+                    data.get(CONF_LIGHT_SCHEDULES, {})
+                )
+        elif self.light_type in (LIGHT_TYPE_SINGLE, LIGHT_TYPE_MULTIPLE_PARALLEL):
+            self.segment = Segment(self.lights)
+        self.brightness_threshold = data.get(CONF_BRIGHTNESS_THRESHOLD, DEFAULT_BRIGHTNESS_THRESHOLD)
+        self.delay_off_time = data.get(CONF_DELAY_OFF_TIME, DEFAULT_DELAY_OFF_TIME)
+        self.sun_fallback = data.get(CONF_SUN_FALLBACK, DEFAULT_SUN_FALLBACK)
+        self.brightness_max_age = data.get(CONF_BRIGHTNESS_MAX_AGE, DEFAULT_BRIGHTNESS_MAX_AGE)
+        self.presence_max_age = data.get(CONF_PRESENCE_MAX_AGE, DEFAULT_PRESENCE_MAX_AGE)
+        self.stale_policy = data.get(CONF_STALE_POLICY, DEFAULT_STALE_POLICY)
+        self.handoff_delay_off = data.get(CONF_HANDOFF_DELAY_OFF, DEFAULT_HANDOFF_DELAY_OFF)
+
+        # 内置状态与条目自定义状态合并为小写集合，判断时只做一次哈希查找
+        self.present_states = _compile_states(PRESENT_STATES, data.get(CONF_PRESENT_STATES))
+        self.absent_states = _compile_states(ABSENT_STATES, data.get(CONF_ABSENT_STATES))
+        self.dark_states = _compile_states(WEAK_LIGHT_STATES, data.get(CONF_DARK_STATES))
+
+        # 亮度比较方式在加载时确定一次，判断时不再逐次尝试解析
+        self.brightness_kind = brightness_kind
+        self.brightness_comparator = BRIGHTNESS_COMPARATORS[brightness_kind]
+        self.brightness_parser = BRIGHTNESS_PARSERS[brightness_kind]
+
+
+class Inputs(NamedTuple):
+    """Snapshot of the sensor and light states a decision is based on."""
+
+    presence_state: Optional[str]
+    # 传感器最后一次上报的时间（last_reported），读数未变化的上报也会更新
+    presence_updated: Optional[datetime.datetime]
+    brightness_state: Optional[str]
+    brightness_updated: Optional[datetime.datetime]
+    light_states: Dict[str, Optional[str]]
+    sun_lux: Optional[float] = None
+    # 处于开/关状态的灯光数量（由灯光状态缓存提供），None 表示未知
+    lights_on: Optional[int] = None
+    lights_off: Optional[int] = None
+
+
+class RuntimeState(NamedTuple):
+    """Runtime state of a zone that decisions depend on."""
+
+    enabled: bool = True
+    delay_off_deadline: Optional[datetime.datetime] = None
+    # 多灯交替模式最近一次开灯所用的时间段
+    applied_segment: Optional[Segment] = None
+
+
+class TurnOn(NamedTuple):
+    """Turn a light on, with optional turn_on service data."""
+
+    entity_id: str
+    data: Optional[Dict[str, Any]] = None
+
+
+class TurnOff(NamedTuple):
+    """Turn a light off."""
+
+    entity_id: str
+
+
+class SetSegment(NamedTuple):
+    """Remember the time segment the lights were turned on for."""
+
+    segment: Segment
+
+
+class ScheduleDelayOff(NamedTuple):
+    """(Re)schedule the delayed turn-off, replacing any pending one."""
+
+    delay: float
+
+
+class Transition(NamedTuple):
+    """Someone arrived (True) or left (False)."""
+
+    presence: bool
+
+
+class Record(NamedTuple):
+    """Record the decision in the occupancy timeline."""
+
+    presence: Optional[bool]
+    lux: Optional[float]
+    action: int
+
+
+def parse_lux(state: Optional[str]) -> Optional[float]:
+    """Return the numeric value of a brightness state, if it has one."""
+    try:
+        return float(state)
+    except (ValueError, TypeError):
+        return None
+
+
+def is_person_present(zone: ZoneConfig, state: Optional[str]) -> bool:
+    """Determine if a person is present based on sensor state."""
+    if zone.sensor_type == SENSOR_TYPE_PRESENCE:
+        return str(state).lower() in zone.present_states
+    if zone.sensor_type == SENSOR_TYPE_MOTION:
+        return str(state).lower() not in zone.absent_states
+    return False
+
+
+def _no_lux(state: Optional[str]) -> None:
+    """Return no numeric value for sensors without one."""
+    return None
+
+
+def _numeric_low(zone: ZoneConfig, state: str) -> bool:
+    """Compare a lux reading with the threshold."""
+    lux = parse_lux(state)
+    return lux is not None and lux < zone.brightness_threshold
+
+
+def _enum_low(zone: ZoneConfig, state: str) -> bool:
+    """Look an enumerated brightness level up in the dark states."""
+    return state.lower() in zone.dark_states
+
+
+def _binary_low(zone: ZoneConfig, state: str) -> bool:
+    """Treat a light binary sensor that detects no light as dark."""
+    return state == STATE_OFF
+
+
+def _auto_low(zone: ZoneConfig, state: str) -> bool:
+    """Compare numerically if the state is a number, otherwise look it up."""
+    lux = parse_lux(state)
+    if lux is not None:
+        return lux < zone.brightness_threshold
+    return str(state).lower() in zone.dark_states
+
+
+BRIGHTNESS_COMPARATORS = {
+    BRIGHTNESS_KIND_AUTO: _auto_low,
+    BRIGHTNESS_KIND_NUMERIC: _numeric_low,
+    BRIGHTNESS_KIND_ENUM: _enum_low,
+    BRIGHTNESS_KIND_BINARY: _binary_low,
+}
+
+BRIGHTNESS_PARSERS = {
+    BRIGHTNESS_KIND_AUTO: parse_lux,
+    BRIGHTNESS_KIND_NUMERIC: parse_lux,
+    BRIGHTNESS_KIND_ENUM: _no_lux,
+    BRIGHTNESS_KIND_BINARY: _no_lux,
+}
+
+
+def detect_brightness_kind(
+    domain: str,
+    device_class: Optional[str],
+    unit: Optional[str],
+    state_class: Optional[str] = None,
+    options: Optional[List[str]] = None,
+) -> str:
+    """Choose the brightness comparator from the sensor's metadata."""
+    if domain == BINARY_SENSOR_DOMAIN:
+        return BRIGHTNESS_KIND_BINARY
+    if device_class == ILLUMINANCE_DEVICE_CLASS or unit or state_class:
+        return BRIGHTNESS_KIND_NUMERIC
+    if device_class == ENUM_DEVICE_CLASS or options:
+        return BRIGHTNESS_KIND_ENUM
+    return BRIGHTNESS_KIND_AUTO
+
+
+def brightness_lux(zone: ZoneConfig, state: Optional[str]) -> Optional[float]:
+    """Return the numeric value of a brightness state if the sensor reports lux."""
+    return zone.brightness_parser(state)
+
+
+def is_brightness_low(zone: ZoneConfig, state: Optional[str]) -> bool:
+    """Determine if brightness is low based on sensor state."""
+    if state in INVALID_STATES:
+        return False
+    return zone.brightness_comparator(zone, state)
+
+
+def _age(now: datetime.datetime, updated: Optional[datetime.datetime]) -> Optional[float]:
+    """Return the age of a reading in seconds."""
+    if updated is None:
+        return None
+    return (now - updated).total_seconds()
+
+
+def is_presence_stale(zone: ZoneConfig, inputs: Inputs, now: datetime.datetime) -> bool:
+    """Return True if the presence reading is past its freshness budget."""
+    if zone.presence_max_age <= 0:
+        return False
+    age = _age(now, inputs.presence_updated)
+    return age is not None and age >= zone.presence_max_age
+
+
+def is_dark(zone: ZoneConfig, inputs: Inputs, now: datetime.datetime) -> bool:
+    """Determine if it is dark, falling back to the sun when the sensor is unusable."""
+    state = inputs.brightness_state
+
+    # 亮度传感器不可用时，使用太阳高度估算
+    if state in INVALID_STATES:
+        if not zone.sun_fallback or inputs.sun_lux is None:
+            return False
+        return inputs.sun_lux < zone.brightness_threshold
+
+    if zone.stale_policy == STALE_POLICY_USE or zone.brightness_max_age <= 0:
+        return is_brightness_low(zone, state)
+
+    age = _age(now, inputs.brightness_updated) or 0.0
+    stale = age >= zone.brightness_max_age
+    if zone.stale_policy == STALE_POLICY_IGNORE or not zone.sun_fallback:
+        return False if stale else is_brightness_low(zone, state)
+
+    sensor_lux = zone.brightness_parser(state)
+    # 非数值亮度状态无法混合，只在未过期时使用
+    if sensor_lux is None and not stale:
+        return is_brightness_low(zone, state)
+
+    lux = blend_lux(sensor_lux, age, zone.brightness_max_age, inputs.sun_lux)
+    if lux is None:
+        return False
+    return lux < zone.brightness_threshold
+
+
+def get_active_segment(zone: ZoneConfig, now: datetime.datetime) -> Segment:
+    """Get the lights to turn on, and their turn_on data, at the given local time."""
+    if zone.schedule is not None:
+        return zone.schedule.segment_at(now)
+    if zone.segment is not None:
+        return zone.segment
+    return Segment(())
+
+
+def _turn_on(zone: ZoneConfig, inputs: Inputs, now: datetime.datetime) -> List[Any]:
+    """Return turn-on actions for the active lights that are off."""
+    if inputs.lights_off == 0:
+        return []
+    segment = get_active_segment(zone, now)
+    actions: List[Any] = [
+        TurnOn(light, segment.data)
+        for light in segment.lights
+        if inputs.light_states.get(light) == STATE_OFF
+    ]
+    if actions and zone.schedule is not None:
+        actions.append(SetSegment(segment))
+    return actions
+
+
+def _switch_segment(
+    zone: ZoneConfig, inputs: Inputs, runtime: RuntimeState, now: datetime.datetime
+) -> List[Any]:
+    """Move the lights of an occupied zone to the segment that has become active.
+
+    Lights outside the new segment are turned off, and lights of the new
+    segment that are already on get its turn_on data if that changed.
+    Nothing happens while the segment the lights were turned on for is
+    still active, so lights switched by hand are left alone.
+    """
+    if zone.schedule is None or runtime.applied_segment is None:
+        return []
+    segment = get_active_segment(zone, now)
+    if segment == runtime.applied_segment:
+        return []
+    light_states = inputs.light_states
+    actions: List[Any] = [
+        TurnOff(light)
+        for light in zone.lights
+        if light not in segment.lights and light_states.get(light) == STATE_ON
+    ]
+    if segment.data and segment.data != runtime.applied_segment.data:
+        actions.extend(
+            TurnOn(light, segment.data)
+            for light in segment.lights
+            if light_states.get(light) == STATE_ON
+        )
+    actions.append(SetSegment(segment))
+    return actions
+
+
+def _turn_off(zone: ZoneConfig, inputs: Inputs) -> List[Any]:
+    """Return turn-off actions for all lights that are on."""
+    if inputs.lights_on == 0:
+        return []
+    return [TurnOff(light) for light in zone.lights if inputs.light_states.get(light) == STATE_ON]
+
+
+def decide_presence_change(
+    zone: ZoneConfig,
+    inputs: Inputs,
+    runtime: RuntimeState,
+    old_presence_state: Optional[str],
+    now: datetime.datetime,
+) -> List[Any]:
+    """Decide what to do when the presence sensor changes."""
+    lux = brightness_lux(zone, inputs.brightness_state)
+    if not runtime.enabled:
+        return [Record(None, lux, ACTION_SKIP_DISABLED)]
+
+    new_presence = is_person_present(zone, inputs.presence_state)
+    old_presence = is_person_present(zone, old_presence_state)
+
+    # 如果新旧状态相同，仍然执行逻辑以确保灯光状态正确
+    if new_presence == old_presence:
+        if new_presence:
+            if is_dark(zone, inputs, now):
+                return _turn_on(zone, inputs, now) + [Record(True, lux, ACTION_TURN_ON)]
+            return [Record(True, lux, ACTION_SKIP_BRIGHT)]
+        return _turn_off(zone, inputs) + [Record(False, lux, ACTION_TURN_OFF)]
+
+    # Person left
+    if not new_presence:
+        actions: List[Any] = [Transition(False)]
+        if zone.delay_off_time > 0:
+            actions.append(ScheduleDelayOff(zone.delay_off_time))
+            actions.append(Record(False, lux, ACTION_DELAY_OFF))
+        else:
+            actions.extend(_turn_off(zone, inputs))
+            actions.append(Record(False, lux, ACTION_TURN_OFF))
+        return actions
+
+    # Person arrived
+    actions = [Transition(True)]
+    if is_dark(zone, inputs, now):
+        actions.extend(_turn_on(zone, inputs, now))
+        actions.append(Record(True, lux, ACTION_TURN_ON))
+    else:
+        actions.append(Record(True, lux, ACTION_SKIP_BRIGHT))
+    return actions
+
+
+def decide_delay_off_expired(zone: ZoneConfig, inputs: Inputs) -> List[Any]:
+    """Decide what to do when the delayed turn-off fires."""
+    if inputs.presence_state is None:
+        return []
+    lux = brightness_lux(zone, inputs.brightness_state)
+    if is_person_present(zone, inputs.presence_state):
+        return [Record(True, lux, ACTION_CANCEL_OFF)]
+    return _turn_off(zone, inputs) + [Record(False, lux, ACTION_TURN_OFF)]
+
+
+def decide_periodic(
+    zone: ZoneConfig, inputs: Inputs, runtime: RuntimeState, now: datetime.datetime
+) -> List[Any]:
+    """Decide what the periodic check should do to reconcile the lights."""
+    if not runtime.enabled or inputs.presence_state is None:
+        return []
+    if zone.stale_policy != STALE_POLICY_USE and is_presence_stale(zone, inputs, now):
+        return [Record(None, brightness_lux(zone, inputs.brightness_state), ACTION_SKIP_STALE)]
+    if inputs.brightness_state is None and not zone.sun_fallback:
+        return []
+
+    if is_person_present(zone, inputs.presence_state):
+        # 有人期间经过时间段边界时切换到新时间段的灯光
+        actions = _switch_segment(zone, inputs, runtime, now)
+        if is_dark(zone, inputs, now):
+            actions.extend(_turn_on(zone, inputs, now))
+        return actions
+    return _turn_off(zone, inputs)
+
+
+def decide_prearm(
+    zone: ZoneConfig, inputs: Inputs, runtime: RuntimeState, now: datetime.datetime
+) -> List[Any]:
+    """Decide whether to turn the lights on ahead of an arrival from a neighbor zone."""
+    if not runtime.enabled:
+        return []
+    if inputs.presence_state is not None and is_person_present(zone, inputs.presence_state):
+        return []
+    if not is_dark(zone, inputs, now):
+        return []
+    actions = _turn_on(zone, inputs, now)
+    if actions:
+        actions.append(Record(False, brightness_lux(zone, inputs.brightness_state), ACTION_PREARM))
+        # 若一段时间内没有人到达，则关闭预开的灯光
+        actions.append(ScheduleDelayOff(PREARM_TIMEOUT))
+    return actions
+
+
+def decide_handoff(
+    zone: ZoneConfig, inputs: Inputs, runtime: RuntimeState, now: datetime.datetime
+) -> List[Any]:
+    """Decide whether to shorten a pending delayed turn-off after a neighbor arrival."""
+    if runtime.delay_off_deadline is None:
+        return []
+    remaining = (runtime.delay_off_deadline - now).total_seconds()
+    if remaining <= zone.handoff_delay_off:
+        return []
+    return [
+        ScheduleDelayOff(zone.handoff_delay_off),
+        Record(False, brightness_lux(zone, inputs.brightness_state), ACTION_HANDOFF),
+    ]
@@ -0,0 +1,64 @@
+"""Diagnostics support for Auto Light."""
+from typing import Any, Dict
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    DATA_ACTUATION_QUEUE,
+    DATA_PROFILER,
+    BRIGHTNESS_KIND_AUTO,
+)
+from .decision import ZoneConfig
+
+# 诊断信息中包含的最近时间线记录条数
+DIAGNOSTICS_TIMELINE_RECORDS = 100
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> Dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id, {})
+    state_data = entry_data.get("state", {})
+    queue = hass.data.get(DOMAIN, {}).get(DATA_ACTUATION_QUEUE)
+    profiler = hass.data.get(DOMAIN, {}).get(DATA_PROFILER)
+    tuner_store = state_data.get("tuner_store")
+    config = entry_data.get("config", dict(entry.data))
+    now = dt_util.utcnow()
+
+    return {
+        "config": config,
+        "enabled": state_data.get("enabled", True),
+        "resources": (
+            state_data["resources"].names if "resources" in state_data else []
+        ),
+        "brightness_kind": state_data.get("brightness_kind"),
+        "inputs": {
+            name: tracker.as_dict(now)
+            for name, tracker in state_data.get("input_trackers", {}).items()
+        },
+        "lights": (
+            state_data["light_cache"].as_dict() if "light_cache" in state_data else None
+        ),
+        "actuation_queue": queue.as_dict() if queue is not None else None,
+        "profiling": profiler.as_dict() if profiler is not None else None,
+        "timeline": (
+            state_data["timeline_store"].timeline.records()[-DIAGNOSTICS_TIMELINE_RECORDS:]
+            if "timeline_store" in state_data
+            else []
+        ),
+        "energy": (
+            state_data["energy_meter"].as_dict(now) if "energy_meter" in state_data else None
+        ),
+        "vocabulary": (
+            state_data["vocabulary"].as_dict(
+                ZoneConfig(config, state_data.get("brightness_kind", BRIGHTNESS_KIND_AUTO))
+            )
+            if "vocabulary" in state_data
+            else None
+        ),
+        "tuning": tuner_store.tuner.as_dict() if tuner_store is not None else None,
+    }
@@ -0,0 +1,177 @@
+"""Per-zone energy accounting for Auto Light.
+
+The meter is updated on light and presence transitions only: between two
+transitions the power drawn is constant, so each update adds
+``watts * elapsed`` to the counters in constant time.
+"""
+import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .const import DEFAULT_LIGHT_WATTAGE, STATE_ON, STATE_OFF
+
+# 瓦秒与千瓦时的换算
+WATT_SECONDS_PER_KWH = 3_600_000
+
+# 单个灯光允许配置的最大功率（瓦）
+MAX_LIGHT_WATTAGE = 10000
+
+
+def validate_wattage(wattage: Any, lights: Iterable[str]) -> Dict[str, float]:
+    """Validate a light -> watts mapping, raising ValueError on errors."""
+    if not wattage:
+        return {}
+    if not isinstance(wattage, dict):
+        raise ValueError("功率配置应为 灯光: 瓦数 的字典")
+    allowed = set(lights)
+    normalized = {}
+    for light, watts in wattage.items():
+        if light not in allowed:
+            raise ValueError(f"未配置的灯光: {light}")
+        watts = float(watts)
+        if not 0 <= watts <= MAX_LIGHT_WATTAGE:
+            raise ValueError(f"灯光 {light} 的功率应在 0-{MAX_LIGHT_WATTAGE} 瓦之间: {watts}")
+        normalized[light] = watts
+    return normalized
+
+
+class EnergyMeter:
+    """Accumulate the energy used by a zone's lights and the energy saved.
+
+    The saving is measured against a baseline where every light is on
+    whenever someone is present: it grows by the wattage of the lights that
+    are off while the zone is occupied. Both counters only ever increase
+    until the daily reset.
+    """
+
+    def __init__(
+        self, lights: Iterable[str], wattage: Dict[str, float], now: datetime.datetime
+    ) -> None:
+        """Initialize the meter with every light in an unknown state."""
+        self.wattage = {light: wattage.get(light, DEFAULT_LIGHT_WATTAGE) for light in lights}
+        self._states: Dict[str, Optional[str]] = dict.fromkeys(self.wattage)
+        self._present = False
+        self._watts_on = 0.0
+        self._watts_off = 0.0
+        self._energy = 0.0
+        self._saved = 0.0
+        self._updated = now
+        self._on_since: Dict[str, Optional[datetime.datetime]] = dict.fromkeys(self.wattage)
+        self._on_seconds: Dict[str, float] = dict.fromkeys(self.wattage, 0.0)
+        self.last_reset = now
+        self._listeners: List[Callable[[], None]] = []
+
+    def _accrue(self, now: datetime.datetime) -> None:
+        """Add the energy used and saved since the last update."""
+        elapsed = (now - self._updated).total_seconds()
+        if elapsed > 0:
+            self._energy += self._watts_on * elapsed
+            if self._present:
+                self._saved += self._watts_off * elapsed
+        self._updated = now
+
+    def observe_light(self, entity_id: str, state: Optional[str], now: datetime.datetime) -> None:
+        """Record a light state; anything but on or off counts as neither."""
+        if entity_id not in self._states:
+            return
+        old_state = self._states[entity_id]
+        if state == old_state:
+            return
+        self._accrue(now)
+        watts = self.wattage[entity_id]
+        if old_state == STATE_ON:
+            self._watts_on -= watts
+            self._on_seconds[entity_id] += (now - self._on_since[entity_id]).total_seconds()
+            self._on_since[entity_id] = None
+        elif old_state == STATE_OFF:
+            self._watts_off -= watts
+        if state == STATE_ON:
+            self._watts_on += watts
+            self._on_since[entity_id] = now
+        elif state == STATE_OFF:
+            self._watts_off += watts
+        self._states[entity_id] = state
+        self._notify()
+
+    def observe_presence(self, present: bool, now: datetime.datetime) -> None:
+        """Record whether someone is present."""
+        if present == self._present:
+            return
+        self._accrue(now)
+        self._present = present
+        self._notify()
+
+    def reset(self, now: datetime.datetime) -> None:
+        """Start a new accounting period."""
+        self._accrue(now)
+        self._energy = 0.0
+        self._saved = 0.0
+        for light, since in self._on_since.items():
+            self._on_seconds[light] = 0.0
+            if since is not None:
+                self._on_since[light] = now
+        self.last_reset = now
+        self._notify()
+
+    def restore(
+        self, energy_kwh: Optional[float] = None, saved_kwh: Optional[float] = None
+    ) -> None:
+        """Continue the current period from previously reported totals."""
+        if energy_kwh is not None:
+            self._energy = max(self._energy, energy_kwh * WATT_SECONDS_PER_KWH)
+        if saved_kwh is not None:
+            self._saved = max(self._saved, saved_kwh * WATT_SECONDS_PER_KWH)
+
+    def energy_kwh(self, now: datetime.datetime) -> float:
+        """Return the energy used in the current period."""
+        elapsed = max((now - self._updated).total_seconds(), 0.0)
+        return (self._energy + self._watts_on * elapsed) / WATT_SECONDS_PER_KWH
+
+    def saved_kwh(self, now: datetime.datetime) -> float:
+        """Return the energy saved in the current period."""
+        saved = self._saved
+        if self._present:
+            saved += self._watts_off * max((now - self._updated).total_seconds(), 0.0)
+        return saved / WATT_SECONDS_PER_KWH
+
+    def light_on_seconds(self, now: datetime.datetime) -> Dict[str, float]:
+        """Return how long each light has been on in the current period."""
+        return {
+            light: seconds + (
+                (now - self._on_since[light]).total_seconds()
+                if self._on_since[light] is not None
+                else 0.0
+            )
+            for light, seconds in self._on_seconds.items()
+        }
+
+    def add_listener(self, update_callback: Callable[[], None]) -> Callable[[], None]:
+        """Call ``update_callback`` after every change; return a remove callable."""
+        self._listeners.append(update_callback)
+
+        def remove_listener() -> None:
+            if update_callback in self._listeners:
+                self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    def _notify(self) -> None:
+        """Call the registered listeners."""
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    def refresh(self) -> None:
+        """Let listeners report the energy accrued since the last transition."""
+        self._notify()
+
+    def as_dict(self, now: datetime.datetime) -> Dict[str, Any]:
+        """Return a diagnostics summary of the meter."""
+        return {
+            "wattage": self.wattage,
+            "present": self._present,
+            "energy_kwh": round(self.energy_kwh(now), 4),
+            "saved_kwh": round(self.saved_kwh(now), 4),
+            "light_on_seconds": {
+                light: round(seconds) for light, seconds in self.light_on_seconds(now).items()
+            },
+            "last_reset": self.last_reset.isoformat(),
+        }
@@ -0,0 +1,88 @@
+"""Freshness tracking for Auto Light sensor inputs."""
+import datetime
+from typing import Any, Dict, Optional
+
+from homeassistant.core import State
+
+
+def reported_at(state: State) -> datetime.datetime:
+    """Return when a state was last reported.
+
+    ``last_updated`` only moves when the value or its attributes change, so a
+    sensor that keeps reporting the same reading would look stale;
+    ``last_reported`` also moves on unchanged reports.
+    """
+    return getattr(state, "last_reported", None) or state.last_updated
+
+
+class InputTracker:
+    """Track how fresh a sensor input is and how often it reports."""
+
+    def __init__(self, entity_id: str, max_age: float) -> None:
+        """Initialize the tracker.
+
+        ``max_age`` is the freshness budget in seconds; 0 disables the check.
+        """
+        self.entity_id = entity_id
+        self.max_age = max_age
+        self.last_state: Optional[str] = None
+        self.last_reported: Optional[datetime.datetime] = None
+        self.update_count = 0
+        self._interval_total = 0.0
+        self._interval_max = 0.0
+
+    def observe(self, state: Optional[State]) -> None:
+        """Record a state object, counting it as a report if it is newer."""
+        if state is None:
+            return
+        reported = reported_at(state)
+        if self.last_reported is not None and reported <= self.last_reported:
+            return
+        if self.last_reported is not None:
+            interval = (reported - self.last_reported).total_seconds()
+            self._interval_total += interval
+            self._interval_max = max(self._interval_max, interval)
+        self.last_state = state.state
+        self.last_reported = reported
+        self.update_count += 1
+
+    def age(self, now: datetime.datetime) -> Optional[float]:
+        """Return the age of the last report in seconds."""
+        if self.last_reported is None:
+            return None
+        return (now - self.last_reported).total_seconds()
+
+    def is_stale(self, now: datetime.datetime) -> bool:
+        """Return True if the last report is older than the budget."""
+        if self.max_age <= 0:
+            return False
+        age = self.age(now)
+        return age is not None and age >= self.max_age
+
+    @property
+    def mean_interval(self) -> Optional[float]:
+        """Return the mean interval between reports in seconds."""
+        if self.update_count < 2:
+            return None
+        return self._interval_total / (self.update_count - 1)
+
+    def as_dict(self, now: datetime.datetime) -> Dict[str, Any]:
+        """Return a diagnostics summary of the tracked input."""
+        age = self.age(now)
+        mean_interval = self.mean_interval
+        return {
+            "entity_id": self.entity_id,
+            "state": self.last_state,
+            "last_reported": self.last_reported.isoformat() if self.last_reported else None,
+            "age": round(age, 1) if age is not None else None,
+            "max_age": self.max_age,
+            "stale": self.is_stale(now),
+            "update_count": self.update_count,
+            "mean_interval": round(mean_interval, 1) if mean_interval is not None else None,
+            "max_interval": round(self._interval_max, 1),
+            "interval_exceeds_budget": (
+                self.max_age > 0
+                and mean_interval is not None
+                and mean_interval >= self.max_age
+            ),
+        }
@@ -0,0 +1,56 @@
+"""Subscription-fed light state cache for Auto Light."""
+from typing import Any, Dict, Iterable, Optional
+
+from .const import STATE_ON, STATE_OFF
+
+
+class LightStateCache:
+    """Keep the on/off/unavailable state of a zone's lights up to date.
+
+    The number of lights in each state is kept alongside the states, so
+    questions such as "are all lights off already?" are answered without
+    touching the state machine. Anything other than on or off (unavailable,
+    unknown, missing) counts as unavailable and is never acted on.
+    """
+
+    def __init__(self, lights: Iterable[str]) -> None:
+        """Initialize the cache with every light unavailable."""
+        self.states: Dict[str, Optional[str]] = dict.fromkeys(lights)
+        self.on_count = 0
+        self.off_count = 0
+        self.unavailable_count = len(self.states)
+
+    def update(self, entity_id: str, state: Optional[str]) -> bool:
+        """Record a light state; return True if the light changed between on, off and unavailable."""
+        if entity_id not in self.states:
+            return False
+        old_state = self.states[entity_id]
+        self.states[entity_id] = state
+        old_class = old_state if old_state in (STATE_ON, STATE_OFF) else None
+        new_class = state if state in (STATE_ON, STATE_OFF) else None
+        if old_class == new_class:
+            return False
+
+        if old_class == STATE_ON:
+            self.on_count -= 1
+        elif old_class == STATE_OFF:
+            self.off_count -= 1
+        else:
+            self.unavailable_count -= 1
+
+        if new_class == STATE_ON:
+            self.on_count += 1
+        elif new_class == STATE_OFF:
+            self.off_count += 1
+        else:
+            self.unavailable_count += 1
+        return True
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return a diagnostics summary of the cache."""
+        return {
+            "states": dict(self.states),
+            "on": self.on_count,
+            "off": self.off_count,
+            "unavailable": self.unavailable_count,
+        }
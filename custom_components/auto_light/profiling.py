@@ -0,0 +1,237 @@
+"""Opt-in profiling of the Auto Light hot paths.
+
+Handlers wrapped with ``Profiler.timed`` only check a flag while profiling
+is off. While it is on, every call is added to a fixed-bin latency
+histogram, and a cProfile or yappi capture can run alongside. This module
+is free of Home Assistant imports.
+"""
+import bisect
+import cProfile
+import functools
+import pstats
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from .const import DOMAIN, DATA_PROFILER
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+# 延迟直方图的分桶上界（微秒），超出最后一个上界的计入溢出桶
+LATENCY_BINS_US = [10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000, 250000]
+
+CAPTURE_NONE = "none"
+CAPTURE_CPROFILE = "cprofile"
+CAPTURE_YAPPI = "yappi"
+CAPTURES = [CAPTURE_NONE, CAPTURE_CPROFILE, CAPTURE_YAPPI]
+
+# 报告中列出的耗时最多的函数数量
+DEFAULT_TOP_FUNCTIONS = 20
+
+
+class LatencyHistogram:
+    """Fixed-bin histogram of call latencies with quantile lookup."""
+
+    def __init__(self) -> None:
+        """Initialize an empty histogram."""
+        self.counts: List[int] = [0] * (len(LATENCY_BINS_US) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Add one call duration."""
+        self.counts[bisect.bisect_left(LATENCY_BINS_US, seconds * 1_000_000)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return the bin upper bound (µs) covering the given fraction of calls."""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target and count:
+                if index < len(LATENCY_BINS_US):
+                    return float(LATENCY_BINS_US[index])
+                break
+        # 溢出桶没有上界，以最大值代替
+        return round(self.max * 1_000_000, 1)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return a summary of the histogram in microseconds."""
+        return {
+            "count": self.count,
+            "mean_us": round(self.total / self.count * 1_000_000, 1) if self.count else None,
+            "p50_us": self.quantile(0.5),
+            "p95_us": self.quantile(0.95),
+            "p99_us": self.quantile(0.99),
+            "max_us": round(self.max * 1_000_000, 1),
+            "bins_us": {
+                **{f"<={bound}": count for bound, count in zip(LATENCY_BINS_US, self.counts)},
+                f">{LATENCY_BINS_US[-1]}": self.counts[-1],
+            },
+        }
+
+
+def _cprofile_top(profile: cProfile.Profile, top: int) -> List[Dict[str, Any]]:
+    """Return the functions with the most cumulative time of a cProfile capture."""
+    stats = pstats.Stats(profile)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+    result = []
+    for func in stats.fcn_list[:top]:
+        _, calls, own, cumulative, _ = stats.stats[func]
+        filename, line, name = func
+        result.append(
+            {
+                "function": f"{filename}:{line}({name})",
+                "calls": calls,
+                "own_ms": round(own * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3),
+            }
+        )
+    return result
+
+
+def _yappi_top(yappi: Any, top: int) -> List[Dict[str, Any]]:
+    """Return the functions with the most total time of a yappi capture."""
+    stats = yappi.get_func_stats()
+    stats.sort("ttot", "desc")
+    result = []
+    for stat in stats:
+        if len(result) >= top:
+            break
+        result.append(
+            {
+                "function": stat.full_name,
+                "calls": stat.ncall,
+                "own_ms": round(stat.tsub * 1000, 3),
+                "cumulative_ms": round(stat.ttot * 1000, 3),
+            }
+        )
+    return result
+
+
+class Profiler:
+    """Latency histograms of the hot paths plus an optional profiler capture."""
+
+    def __init__(self) -> None:
+        """Initialize a disabled profiler."""
+        self.enabled = False
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.capture = CAPTURE_NONE
+        self.started: Optional[float] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._yappi: Any = None
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Add one call duration to the named histogram."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def timed(self, name: str) -> Callable[[Callable], Callable]:
+        """Return a decorator timing a synchronous function while profiling is on."""
+
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+
+            return wrapper
+
+        return decorator
+
+    def start(self, capture: str = CAPTURE_NONE) -> None:
+        """Clear the histograms and start profiling, raising RuntimeError if it cannot start."""
+        if self.enabled:
+            raise RuntimeError("性能分析已在进行中")
+        if capture == CAPTURE_CPROFILE:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                # 同一时间只能有一个分析器处于活动状态
+                raise RuntimeError(f"无法启动 cProfile: {e}") from e
+            self._profile = profile
+        elif capture == CAPTURE_YAPPI:
+            try:
+                import yappi
+            except ImportError as e:
+                raise RuntimeError("未安装 yappi，无法使用 yappi 分析") from e
+            yappi.clear_stats()
+            yappi.set_clock_type("wall")
+            yappi.start()
+            self._yappi = yappi
+        self.histograms = {}
+        self.capture = capture
+        self.started = time.monotonic()
+        self.enabled = True
+
+    def stop(self, top: int = DEFAULT_TOP_FUNCTIONS) -> Dict[str, Any]:
+        """Stop profiling and return the report.
+
+        A cProfile or yappi capture is kept until ``save_stats`` is called,
+        so writing it to disk can run in an executor.
+        """
+        self.enabled = False
+        report: Dict[str, Any] = {
+            "capture": self.capture,
+            "duration": round(time.monotonic() - self.started, 3) if self.started else 0.0,
+            "timings": {name: histogram.as_dict() for name, histogram in sorted(self.histograms.items())},
+        }
+        if self._profile is not None:
+            self._profile.disable()
+            report["functions"] = _cprofile_top(self._profile, top)
+        elif self._yappi is not None:
+            self._yappi.stop()
+            report["functions"] = _yappi_top(self._yappi, top)
+        self.started = None
+        self.last_report = report
+        return report
+
+    def save_stats(self, path: Optional[str]) -> None:
+        """Write the stopped capture in pstats format and release it; blocking I/O."""
+        try:
+            if path is not None:
+                if self._profile is not None:
+                    self._profile.dump_stats(path)
+                elif self._yappi is not None:
+                    self._yappi.get_func_stats().save(path, type="pstat")
+        finally:
+            if self._yappi is not None:
+                self._yappi.clear_stats()
+            self._profile = None
+            self._yappi = None
+            self.capture = CAPTURE_NONE
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return a diagnostics summary of the profiler."""
+        return {
+            "enabled": self.enabled,
+            "capture": self.capture,
+            "timings": {name: histogram.as_dict() for name, histogram in sorted(self.histograms.items())},
+            "last_report": self.last_report,
+        }
+
+
+def get_profiler(hass: "HomeAssistant") -> Profiler:
+    """Return the domain-wide profiler, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    profiler = domain_data.get(DATA_PROFILER)
+    if profiler is None:
+        profiler = Profiler()
+        domain_data[DATA_PROFILER] = profiler
+    return profiler
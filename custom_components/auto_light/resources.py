@@ -0,0 +1,80 @@
+"""Ownership registry for the listeners, timers and stores of an entry."""
+import logging
+from typing import Any, Callable, Dict, List
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class EntryResources:
+    """Track everything an entry has to release when it is unloaded.
+
+    Listeners and timers are registered under a name together with their
+    remove callable; registering a name again releases the previous one first.
+    Stores are saved separately once the listeners are gone, so the unload
+    can await the save. Releasing is idempotent, and anything
+    registered after release is removed immediately, so a callback racing
+    with an unload cannot leak a listener.
+    """
+
+    def __init__(self, entry_id: str) -> None:
+        """Initialize an empty registry."""
+        self.entry_id = entry_id
+        self._removers: Dict[str, Callable[[], None]] = {}
+        self._stores: List[Any] = []
+        self.released = False
+
+    def __contains__(self, name: str) -> bool:
+        """Return True if a resource is registered under the name."""
+        return name in self._removers
+
+    @property
+    def names(self) -> List[str]:
+        """Return the names of the registered resources."""
+        return sorted(self._removers)
+
+    def track(self, name: str, remove: Callable[[], None]) -> None:
+        """Register a remove callable under a name."""
+        if self.released:
+            _LOGGER.debug(f"条目 {self.entry_id} 已卸载，立即移除 {name}")
+            remove()
+            return
+        self.untrack(name)
+        self._removers[name] = remove
+
+    def untrack(self, name: str) -> bool:
+        """Remove and forget the resource registered under a name."""
+        remove = self._removers.pop(name, None)
+        if remove is None:
+            return False
+        remove()
+        return True
+
+    def discard(self, name: str) -> None:
+        """Forget a resource that has already released itself, such as a fired timer."""
+        self._removers.pop(name, None)
+
+    def add_store(self, store: Any) -> None:
+        """Register a store to save on release."""
+        self._stores.append(store)
+
+    def release(self) -> None:
+        """Remove all listeners and timers."""
+        if self.released:
+            return
+        self.released = True
+        # 按注册的相反顺序移除
+        while self._removers:
+            name, remove = self._removers.popitem()
+            try:
+                remove()
+            except Exception as e:
+                _LOGGER.error(f"移除 {name} 时出错: {e}", exc_info=True)
+
+    async def async_save_stores(self) -> None:
+        """Save the stores once; call after ``release`` so nothing is recorded afterwards."""
+        stores, self._stores = self._stores, []
+        for store in stores:
+            try:
+                await store.async_save()
+            except Exception as e:
+                _LOGGER.error(f"保存 {type(store).__name__} 时出错: {e}", exc_info=True)
@@ -0,0 +1,173 @@
+"""Week schedules for the multiple_alternate light mode.
+
+Schedules are compiled once into an index with one entry per minute of the
+week, so finding the active segment is a single array lookup however many
+segments are configured. This module is free of Home Assistant imports.
+"""
+import datetime
+from array import array
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .const import (
+    SEGMENT_PROFILE_ALL,
+    SEGMENT_PROFILE_WEEKDAY,
+    SEGMENT_PROFILE_WEEKEND,
+)
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# 各作息档对应的星期（0 为周一）
+PROFILE_WEEKDAYS = {
+    SEGMENT_PROFILE_ALL: range(7),
+    SEGMENT_PROFILE_WEEKDAY: range(5),
+    SEGMENT_PROFILE_WEEKEND: range(5, 7),
+}
+
+# 每段可设置的亮度（%）与色温（K）范围
+BRIGHTNESS_PCT_RANGE = (1, 100)
+COLOR_TEMP_KELVIN_RANGE = (1000, 10000)
+
+# 索引中表示“无时间段”的值
+NO_SEGMENT = 0
+
+
+class Segment(NamedTuple):
+    """Lights to turn on during a time segment, with optional turn_on data."""
+
+    lights: Tuple[str, ...]
+    data: Optional[Dict[str, Any]] = None
+
+
+def _parse_minute(value: str) -> int:
+    """Return the minute of the day of a ``HH:MM[:SS]`` string."""
+    parts = str(value).split(":")
+    hour = int(parts[0])
+    minute = int(parts[1]) if len(parts) > 1 else 0
+    if not 0 <= hour <= 24 or not 0 <= minute < 60 or hour * 60 + minute > MINUTES_PER_DAY:
+        raise ValueError(f"无效的时间: {value}")
+    return hour * 60 + minute
+
+
+def _check_range(name: str, value: Any, bounds: Tuple[int, int]) -> int:
+    """Return the value as an int, raising ValueError if it is out of bounds."""
+    number = int(value)
+    if not bounds[0] <= number <= bounds[1]:
+        raise ValueError(f"{name} 应在 {bounds[0]}-{bounds[1]} 之间: {value}")
+    return number
+
+
+def validate_segments(segments: Any, lights: Iterable[str]) -> List[Dict[str, Any]]:
+    """Validate and normalize configured segments, raising ValueError on errors."""
+    if not isinstance(segments, list):
+        raise ValueError("时间段配置应为列表")
+    allowed = set(lights)
+    normalized = []
+    for index, segment in enumerate(segments, 1):
+        if not isinstance(segment, dict):
+            raise ValueError(f"第{index}段应为字典")
+        profile = segment.get("profile", SEGMENT_PROFILE_ALL)
+        if profile not in PROFILE_WEEKDAYS:
+            raise ValueError(f"第{index}段的作息档无效: {profile}")
+        segment_lights = segment.get("lights")
+        if isinstance(segment_lights, str):
+            segment_lights = [segment_lights]
+        if not segment_lights:
+            raise ValueError(f"第{index}段没有设置灯光")
+        unknown = [light for light in segment_lights if light not in allowed]
+        if unknown:
+            raise ValueError(f"第{index}段包含未配置的灯光: {unknown}")
+        _parse_minute(segment["start"])
+        _parse_minute(segment["end"])
+        item = {
+            "profile": profile,
+            "start": str(segment["start"]),
+            "end": str(segment["end"]),
+            "lights": list(segment_lights),
+        }
+        if segment.get("brightness_pct") is not None:
+            item["brightness_pct"] = _check_range(
+                "brightness_pct", segment["brightness_pct"], BRIGHTNESS_PCT_RANGE
+            )
+        if segment.get("color_temp_kelvin") is not None:
+            item["color_temp_kelvin"] = _check_range(
+                "color_temp_kelvin", segment["color_temp_kelvin"], COLOR_TEMP_KELVIN_RANGE
+            )
+        normalized.append(item)
+    return normalized
+
+
+class WeekSchedule:
+    """Segments compiled into a minute-of-week index."""
+
+    def __init__(self, segments: List[Segment], default: int = NO_SEGMENT) -> None:
+        """Initialize an empty index over the given segments.
+
+        Index 0 is reserved for minutes no segment covers and resolves to
+        ``default``.
+        """
+        self.segments = [Segment(())] + segments
+        self._default = default
+        self._index = array("H", bytes(2 * MINUTES_PER_WEEK))
+
+    def _fill(self, segment_id: int, weekdays: Iterable[int], start: int, end: int) -> None:
+        """Mark the minutes from start to end on the given days, wrapping past midnight."""
+        if start == end:
+            # 开始与结束相同表示全天
+            end = start + MINUTES_PER_DAY
+        elif end < start:
+            end += MINUTES_PER_DAY
+        for weekday in weekdays:
+            base = weekday * MINUTES_PER_DAY
+            for minute in range(base + start, base + end):
+                self._index[minute % MINUTES_PER_WEEK] = segment_id
+
+    @classmethod
+    def from_segments(cls, segments: List[Dict[str, Any]]) -> "WeekSchedule":
+        """Compile configured segments; the first listed segment wins where they overlap.
+
+        Minutes no segment covers have no active lights. A segment that runs
+        past midnight belongs to the day it starts on.
+        """
+        compiled = []
+        for segment in segments:
+            data = {
+                key: segment[key]
+                for key in ("brightness_pct", "color_temp_kelvin")
+                if segment.get(key) is not None
+            }
+            compiled.append(Segment(tuple(segment["lights"]), data or None))
+        schedule = cls(compiled)
+        for segment_id in range(len(segments), 0, -1):
+            segment = segments[segment_id - 1]
+            schedule._fill(
+                segment_id,
+                PROFILE_WEEKDAYS[segment.get("profile", SEGMENT_PROFILE_ALL)],
+                _parse_minute(segment["start"]),
+                _parse_minute(segment["end"]),
+            )
+        return schedule
+
+    @classmethod
+    def from_light_schedules(cls, light_schedules: Dict[str, Dict[str, str]]) -> "WeekSchedule":
+        """Compile the hourly one-light-per-slot schedules of the original config.
+
+        The first matching light wins, and the first light is used where no
+        schedule matches, as before.
+        """
+        items = list(light_schedules.items())
+        schedule = cls(
+            [Segment((light_id,)) for light_id, _ in items],
+            default=1 if items else NO_SEGMENT,
+        )
+        for segment_id in range(len(items), 0, -1):
+            _, light_schedule = items[segment_id - 1]
+            start_hour = int(light_schedule["start"].split(":")[0])
+            end_hour = int(light_schedule["end"].split(":")[0])
+            schedule._fill(segment_id, range(7), start_hour * 60, end_hour * 60)
+        return schedule
+
+    def segment_at(self, now: datetime.datetime) -> Segment:
+        """Return the segment active at the given local time."""
+        segment_id = self._index[now.weekday() * MINUTES_PER_DAY + now.hour * 60 + now.minute]
+        return self.segments[segment_id or self._default]
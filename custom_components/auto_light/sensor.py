@@ -0,0 +1,115 @@
+"""Sensor platform for Auto Light integration."""
+import logging
+from typing import Any, Dict
+
+from homeassistant.components.sensor import (
+    RestoreSensor,
+    SensorDeviceClass,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import UnitOfEnergy
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, CONF_NAME, DEFAULT_NAME
+from .energy import EnergyMeter
+
+_LOGGER = logging.getLogger(__name__)
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Set up the Auto Light energy sensors."""
+    name = entry.data.get(CONF_NAME, DEFAULT_NAME)
+    energy_meter = hass.data[DOMAIN][entry.entry_id]["state"]["energy_meter"]
+    
+    async_add_entities(
+        [
+            AutoLightEnergySensor(entry.entry_id, name, energy_meter),
+            AutoLightEnergySavedSensor(entry.entry_id, name, energy_meter),
+        ]
+    )
+
+class AutoLightEnergyBaseSensor(RestoreSensor):
+    """Base class of the daily energy sensors of a zone."""
+
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    _attr_suggested_display_precision = 3
+    _attr_should_poll = False
+
+    def __init__(
+        self, entry_id: str, name: str, energy_meter: EnergyMeter, restore_key: str
+    ) -> None:
+        """Initialize the sensor.
+
+        ``restore_key`` is the ``EnergyMeter.restore`` keyword the sensor's
+        reading is restored through.
+        """
+        self.entry_id = entry_id
+        self._energy_meter = energy_meter
+        self._restore_key = restore_key
+        self._attr_name = name
+
+    async def async_added_to_hass(self) -> None:
+        """Restore today's value and follow the meter."""
+        await super().async_added_to_hass()
+        last_state = await self.async_get_last_state()
+        last_data = await self.async_get_last_sensor_data()
+        # 同一天内重新加载时接着上次的读数累计，跨天则从零开始
+        if (
+            last_state is not None
+            and last_data is not None
+            and last_data.native_value is not None
+            and dt_util.as_local(last_state.last_updated).date() == dt_util.now().date()
+        ):
+            try:
+                self._energy_meter.restore(**{self._restore_key: float(last_data.native_value)})
+            except (ValueError, TypeError):
+                _LOGGER.warning(f"无法恢复 {self.entity_id} 的读数: {last_data.native_value}")
+        self.async_on_remove(self._energy_meter.add_listener(self._handle_meter_update))
+
+    @callback
+    def _handle_meter_update(self) -> None:
+        """Write the state after the meter changed."""
+        self.async_write_ha_state()
+
+class AutoLightEnergySensor(AutoLightEnergyBaseSensor):
+    """Energy used today by the lights of a zone."""
+
+    def __init__(self, entry_id: str, name: str, energy_meter: EnergyMeter) -> None:
+        """Initialize the sensor."""
+        super().__init__(entry_id, f"{name} 用电量", energy_meter, "energy_kwh")
+        self._attr_unique_id = f"{entry_id}_energy"
+
+    @property
+    def native_value(self) -> float:
+        """Return the energy used today."""
+        return round(self._energy_meter.energy_kwh(dt_util.utcnow()), 4)
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return how long each light has been on today."""
+        return {
+            "light_on_seconds": {
+                light: round(seconds)
+                for light, seconds in self._energy_meter.light_on_seconds(dt_util.utcnow()).items()
+            },
+            "wattage": self._energy_meter.wattage,
+        }
+
+class AutoLightEnergySavedSensor(AutoLightEnergyBaseSensor):
+    """Energy saved today compared with lights on whenever someone is present."""
+
+    def __init__(self, entry_id: str, name: str, energy_meter: EnergyMeter) -> None:
+        """Initialize the sensor."""
+        super().__init__(entry_id, f"{name} 节省电量", energy_meter, "saved_kwh")
+        self._attr_unique_id = f"{entry_id}_energy_saved"
+
+    @property
+    def native_value(self) -> float:
+        """Return the energy saved today."""
+        return round(self._energy_meter.saved_kwh(dt_util.utcnow()), 4)
@@ -0,0 +1,150 @@
+"""Solar elevation based ambient light estimation for Auto Light."""
+import asyncio
+import datetime
+import logging
+import math
+from typing import TYPE_CHECKING, List, Optional
+
+from .const import DOMAIN, DATA_SOLAR_ESTIMATOR, DEFAULT_DAYLIGHT_FACTOR
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+SUN_ENTITY = "sun.sun"
+
+# 每天预计算的时间槽长度（分钟）
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+# 民用晨昏蒙影的太阳高度下限（度）以及地平线处的室外照度（lux）
+CIVIL_TWILIGHT_ELEVATION = -6.0
+HORIZON_LUX = 400.0
+
+
+def estimate_outdoor_lux(elevation: Optional[float]) -> float:
+    """Estimate clear-sky outdoor illuminance from the solar elevation in degrees."""
+    if elevation is None or elevation <= CIVIL_TWILIGHT_ELEVATION:
+        return 0.0
+    if elevation <= 0:
+        # 晨昏蒙影期间线性过渡
+        return HORIZON_LUX * (elevation - CIVIL_TWILIGHT_ELEVATION) / -CIVIL_TWILIGHT_ELEVATION
+    sin_el = math.sin(math.radians(elevation))
+    # 简化的晴空模型，考虑大气衰减
+    return HORIZON_LUX + 128000.0 * sin_el * math.exp(-0.2 / max(sin_el, 0.01))
+
+
+def estimate_indoor_lux(elevation: Optional[float], daylight_factor: float) -> float:
+    """Estimate indoor illuminance as a fixed fraction of the outdoor value."""
+    return estimate_outdoor_lux(elevation) * daylight_factor
+
+
+def blend_lux(
+    sensor_lux: Optional[float],
+    age: float,
+    max_age: float,
+    estimated_lux: Optional[float],
+) -> Optional[float]:
+    """Blend a sensor reading with the solar estimate according to its age.
+
+    A fresh reading is trusted fully; its weight decreases linearly with age
+    and the estimate is used alone once the reading is older than ``max_age``.
+    A ``max_age`` of 0 disables age checking.
+    """
+    if sensor_lux is None:
+        return estimated_lux
+    if estimated_lux is None or max_age <= 0:
+        return sensor_lux
+    if age >= max_age:
+        return estimated_lux
+    weight = 1.0 - max(age, 0.0) / max_age
+    return weight * sensor_lux + (1.0 - weight) * estimated_lux
+
+
+class SolarLuxEstimator:
+    """Estimate indoor lux from the sun position, precomputed once per day.
+
+    One estimator is shared by all entries. The table of a new day is built
+    in the executor; until it is ready the live elevation of ``sun.sun`` is
+    used.
+    """
+
+    def __init__(self, hass: "HomeAssistant", daylight_factor: float) -> None:
+        """Initialize the estimator."""
+        self._hass = hass
+        self._daylight_factor = daylight_factor
+        self._date: Optional[datetime.date] = None
+        self._table: Optional[List[float]] = None
+        self._build_task: Optional[asyncio.Task] = None
+
+    def _build_table(self, date: datetime.date, tzinfo) -> Optional[List[float]]:
+        """Precompute the estimated lux for every slot of the given day; runs in the executor."""
+        try:
+            from homeassistant.helpers.sun import get_astral_location
+
+            location, observer_elevation = get_astral_location(self._hass)
+            start = datetime.datetime.combine(date, datetime.time(), tzinfo)
+            table = []
+            for slot in range(SLOTS_PER_DAY):
+                moment = start + datetime.timedelta(minutes=slot * SLOT_MINUTES)
+                elevation = location.solar_elevation(moment, observer_elevation)
+                table.append(estimate_indoor_lux(elevation, self._daylight_factor))
+            _LOGGER.info(f"已预计算 {date} 的太阳照度表，共 {len(table)} 个时间槽")
+            return table
+        except Exception as e:
+            _LOGGER.warning(f"无法预计算太阳照度表，将使用 {SUN_ENTITY} 的实时高度: {e}")
+            return None
+
+    async def _async_build_table(self, date: datetime.date, tzinfo) -> None:
+        """Build the table of a day in the executor and install it if the day is still current."""
+        table = await self._hass.async_add_executor_job(self._build_table, date, tzinfo)
+        if self._date == date:
+            self._table = table
+
+    def _elevation_from_entity(self) -> Optional[float]:
+        """Read the current solar elevation from the sun entity."""
+        sun_state = self._hass.states.get(SUN_ENTITY)
+        if sun_state is None:
+            return None
+        try:
+            return float(sun_state.attributes.get("elevation"))
+        except (ValueError, TypeError):
+            return None
+
+    def estimate(self, now: datetime.datetime) -> Optional[float]:
+        """Return the estimated indoor lux at the given local time."""
+        date = now.date()
+        if self._date != date:
+            self._table = None
+            # 同一时间只计算一张表；上一张仍在计算时先用实时高度，完成后再开始新的一天
+            if self._build_task is None or self._build_task.done():
+                self._date = date
+                self._build_task = self._hass.async_create_task(
+                    self._async_build_table(date, now.tzinfo)
+                )
+
+        if self._table is not None:
+            slot = (now.hour * 60 + now.minute) // SLOT_MINUTES
+            return self._table[slot]
+
+        elevation = self._elevation_from_entity()
+        if elevation is None:
+            return None
+        return estimate_indoor_lux(elevation, self._daylight_factor)
+
+    def async_cancel(self) -> None:
+        """Stop building the table of the day."""
+        if self._build_task is not None and not self._build_task.done():
+            self._build_task.cancel()
+        self._build_task = None
+
+
+def get_solar_estimator(hass: "HomeAssistant") -> SolarLuxEstimator:
+    """Return the domain-wide solar estimator, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    estimator = domain_data.get(DATA_SOLAR_ESTIMATOR)
+    if estimator is None:
+        estimator = SolarLuxEstimator(hass, DEFAULT_DAYLIGHT_FACTOR)
+        domain_data[DATA_SOLAR_ESTIMATOR] = estimator
+    return estimator
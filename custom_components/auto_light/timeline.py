@@ -0,0 +1,219 @@
+"""Compact occupancy timeline recorder for Auto Light."""
+import base64
+import datetime
+import logging
+import math
+from array import array
+from typing import Any, Dict, List, Optional
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN,
+    ACTION_NONE,
+    ACTION_TURN_ON,
+    ACTION_TURN_OFF,
+    ACTION_DELAY_OFF,
+    ACTION_CANCEL_OFF,
+    ACTION_SKIP_DISABLED,
+    ACTION_SKIP_BRIGHT,
+    ACTION_SKIP_STALE,
+    ACTION_PREARM,
+    ACTION_HANDOFF,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+# 延迟写盘时间（秒），避免每条记录都写文件
+SAVE_DELAY = 60
+
+ACTION_NAMES = {
+    ACTION_NONE: "none",
+    ACTION_TURN_ON: "turn_on",
+    ACTION_TURN_OFF: "turn_off",
+    ACTION_DELAY_OFF: "delay_off",
+    ACTION_CANCEL_OFF: "cancel_off",
+    ACTION_SKIP_DISABLED: "skip_disabled",
+    ACTION_SKIP_BRIGHT: "skip_bright",
+    ACTION_SKIP_STALE: "skip_stale",
+    ACTION_PREARM: "prearm",
+    ACTION_HANDOFF: "handoff",
+}
+
+# 人在状态编码，-1 表示未知
+PRESENCE_UNKNOWN = -1
+
+
+class OccupancyTimeline:
+    """Ring buffer of (timestamp, presence, lux, action) records.
+
+    Records are kept in parallel typed arrays so each costs 10 bytes in memory
+    and on disk. When the buffer is full and its oldest record is still within
+    the retention period, the buffer doubles (up to ``max_capacity``) so busy
+    zones keep the whole period; otherwise the oldest record is overwritten.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        retention: Optional[datetime.timedelta] = None,
+        max_capacity: Optional[int] = None,
+    ) -> None:
+        """Initialize an empty timeline.
+
+        Without ``retention`` the buffer keeps a fixed size.
+        """
+        self.capacity = capacity
+        self.retention = retention
+        self.max_capacity = max(max_capacity or capacity, capacity)
+        self._timestamps = array("I", bytes(4 * capacity))
+        self._presence = array("b", bytes(capacity))
+        self._lux = array("f", bytes(4 * capacity))
+        self._actions = array("B", bytes(capacity))
+        self._head = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Return the number of stored records."""
+        return self._count
+
+    def _resize(self, capacity: int) -> None:
+        """Reallocate the buffer, keeping the newest records that fit, oldest first."""
+        start = (self._head - self._count) % self.capacity
+        keep = min(self._count, capacity)
+        order = [(start + offset) % self.capacity for offset in range(self._count - keep, self._count)]
+        timestamps = array("I", bytes(4 * capacity))
+        presence = array("b", bytes(capacity))
+        lux = array("f", bytes(4 * capacity))
+        actions = array("B", bytes(capacity))
+        for target, index in enumerate(order):
+            timestamps[target] = self._timestamps[index]
+            presence[target] = self._presence[index]
+            lux[target] = self._lux[index]
+            actions[target] = self._actions[index]
+        self._timestamps, self._presence, self._lux, self._actions = timestamps, presence, lux, actions
+        self.capacity = capacity
+        self._count = keep
+        self._head = keep % capacity
+
+    def _should_grow(self, timestamp: int) -> bool:
+        """Return True if the full buffer would drop a record still within the retention period."""
+        if self.retention is None or self._count < self.capacity or self.capacity >= self.max_capacity:
+            return False
+        oldest = self._timestamps[self._head]
+        return timestamp - oldest < self.retention.total_seconds()
+
+    def record(
+        self,
+        timestamp: datetime.datetime,
+        presence: Optional[bool],
+        lux: Optional[float],
+        action: int,
+    ) -> None:
+        """Append a record, growing the buffer or overwriting the oldest one when full."""
+        seconds = int(timestamp.timestamp())
+        if self._should_grow(seconds):
+            new_capacity = min(self.capacity * 2, self.max_capacity)
+            _LOGGER.info(f"人在时间线记录频繁，容量由 {self.capacity} 扩大到 {new_capacity}")
+            self._resize(new_capacity)
+        index = self._head
+        self._timestamps[index] = seconds
+        self._presence[index] = PRESENCE_UNKNOWN if presence is None else int(presence)
+        self._lux[index] = math.nan if lux is None else lux
+        self._actions[index] = action
+        self._head = (index + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def records(self, since: Optional[datetime.datetime] = None) -> List[Dict[str, Any]]:
+        """Return the stored records oldest first, optionally only those after ``since``."""
+        start = (self._head - self._count) % self.capacity
+        since_ts = int(since.timestamp()) if since is not None else 0
+        result = []
+        for offset in range(self._count):
+            index = (start + offset) % self.capacity
+            if self._timestamps[index] < since_ts:
+                continue
+            presence = self._presence[index]
+            lux = self._lux[index]
+            result.append(
+                {
+                    "timestamp": datetime.datetime.fromtimestamp(
+                        self._timestamps[index], datetime.timezone.utc
+                    ).isoformat(),
+                    "presence": None if presence == PRESENCE_UNKNOWN else bool(presence),
+                    "lux": None if math.isnan(lux) else round(lux, 1),
+                    "action": ACTION_NAMES.get(self._actions[index], "unknown"),
+                }
+            )
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the buffer as base64 encoded arrays."""
+        return {
+            "capacity": self.capacity,
+            "head": self._head,
+            "count": self._count,
+            "timestamps": base64.b64encode(self._timestamps.tobytes()).decode(),
+            "presence": base64.b64encode(self._presence.tobytes()).decode(),
+            "lux": base64.b64encode(self._lux.tobytes()).decode(),
+            "actions": base64.b64encode(self._actions.tobytes()).decode(),
+        }
+
+    def load_dict(self, data: Dict[str, Any]) -> None:
+        """Restore records serialized by ``to_dict``, keeping the newest that fit."""
+        stored = OccupancyTimeline(data["capacity"])
+        stored._timestamps = array("I", base64.b64decode(data["timestamps"]))
+        stored._presence = array("b", base64.b64decode(data["presence"]))
+        stored._lux = array("f", base64.b64decode(data["lux"]))
+        stored._actions = array("B", base64.b64decode(data["actions"]))
+        stored._head = data["head"]
+        stored._count = data["count"]
+
+        # 之前已扩容的时间线按扩容后的大小恢复
+        if stored._count > self.capacity and self.retention is not None:
+            self._resize(min(stored._count, self.max_capacity))
+
+        # 容量可能已变化，按时间顺序重新写入
+        start = (stored._head - stored._count) % stored.capacity
+        for offset in range(max(0, stored._count - self.capacity), stored._count):
+            index = (start + offset) % stored.capacity
+            target = self._head
+            self._timestamps[target] = stored._timestamps[index]
+            self._presence[target] = stored._presence[index]
+            self._lux[target] = stored._lux[index]
+            self._actions[target] = stored._actions[index]
+            self._head = (target + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+
+class TimelineStore:
+    """Persist an entry's timeline through the Home Assistant storage helper."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, timeline: OccupancyTimeline) -> None:
+        """Initialize the store."""
+        self.timeline = timeline
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.timeline.{entry_id}")
+
+    async def async_load(self) -> None:
+        """Load the persisted timeline, if any."""
+        try:
+            data = await self._store.async_load()
+            if data:
+                self.timeline.load_dict(data)
+                _LOGGER.info(f"已加载 {len(self.timeline)} 条人在时间线记录")
+        except Exception as e:
+            _LOGGER.warning(f"加载人在时间线失败，将重新记录: {e}")
+
+    def async_schedule_save(self) -> None:
+        """Schedule a delayed save of the timeline."""
+        self._store.async_delay_save(self.timeline.to_dict, SAVE_DELAY)
+
+    async def async_save(self) -> None:
+        """Save the timeline immediately."""
+        await self._store.async_save(self.timeline.to_dict())
+
+    async def async_remove(self) -> None:
+        """Remove the persisted timeline."""
+        await self._store.async_remove()
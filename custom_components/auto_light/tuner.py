@@ -0,0 +1,267 @@
+"""Online tuning of brightness threshold and delay-off time for Auto Light."""
+import bisect
+import logging
+import math
+from typing import Any, Dict, List, Optional
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, CONF_BRIGHTNESS_THRESHOLD, CONF_DELAY_OFF_TIME
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 300
+
+# 离开后多久内返回算作"误关灯"（秒），更久的返回视为真正离开
+MAX_RETURN_GAP = 900
+# 返回间隔直方图的分桶上界（秒），同时是延迟关灯时间的候选值；0 表示离开后立即关灯
+RETURN_GAP_BINS = [0, 5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 240, 300, 420, 600, MAX_RETURN_GAP]
+# 一次误关灯（离开后短时返回时灯已关闭）折合的开灯时长（秒），用于权衡延迟关灯时间
+FALSE_OFF_COST = 300
+# 建议的亮度阈值限制在到达时亮度均值的若干倍标准差之内
+ARRIVAL_LUX_SPREAD = 2
+# 给出建议前需要的最少样本数
+MIN_SAMPLES = 10
+
+
+class RunningStats:
+    """Welford running mean and variance."""
+
+    def __init__(self) -> None:
+        """Initialize empty statistics."""
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value: float) -> None:
+        """Add one observation."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def std(self) -> float:
+        """Return the sample standard deviation."""
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self._m2 / (self.count - 1))
+
+    def to_dict(self) -> Dict[str, float]:
+        """Serialize the statistics."""
+        return {"count": self.count, "mean": self.mean, "m2": self._m2}
+
+    def load_dict(self, data: Dict[str, float]) -> None:
+        """Restore serialized statistics."""
+        self.count = int(data.get("count", 0))
+        self.mean = float(data.get("mean", 0.0))
+        self._m2 = float(data.get("m2", 0.0))
+
+
+class GapHistogram:
+    """Fixed-bin histogram of return gaps."""
+
+    def __init__(self) -> None:
+        """Initialize an empty histogram."""
+        self.counts: List[int] = [0] * len(RETURN_GAP_BINS)
+
+    @property
+    def total(self) -> int:
+        """Return the number of observations."""
+        return sum(self.counts)
+
+    def add(self, gap: float) -> None:
+        """Add a return gap; gaps beyond the last bin are not counted."""
+        index = bisect.bisect_left(RETURN_GAP_BINS, gap)
+        if index < len(self.counts):
+            self.counts[index] += 1
+
+
+class ZoneTuner:
+    """Learn per-zone threshold and delay-off suggestions from observed behavior."""
+
+    def __init__(self) -> None:
+        """Initialize the tuner."""
+        self.arrival_lux = RunningStats()
+        # 自动化未开灯但用户手动开灯时的亮度
+        self.needed_lux = RunningStats()
+        # 自动化开灯后用户很快手动关灯时的亮度
+        self.unneeded_lux = RunningStats()
+        self.return_gaps = GapHistogram()
+        self.departures = 0
+        self.applied: Dict[str, int] = {}
+        # 每个已应用参数学习时用户配置的值，配置改变说明用户覆盖了学习结果
+        self.learned_from: Dict[str, Any] = {}
+
+    def observe_arrival(self, lux: Optional[float]) -> None:
+        """Record the lux level at an arrival."""
+        if lux is not None:
+            self.arrival_lux.add(lux)
+
+    def observe_manual_on(self, lux: Optional[float]) -> None:
+        """Record a manual turn-on after the automation decided it was bright enough."""
+        if lux is not None:
+            self.needed_lux.add(lux)
+
+    def observe_manual_off(self, lux: Optional[float]) -> None:
+        """Record a manual turn-off shortly after the automation turned the lights on."""
+        if lux is not None:
+            self.unneeded_lux.add(lux)
+
+    def observe_departure(self) -> None:
+        """Record a departure, whether or not someone comes back."""
+        self.departures += 1
+
+    def observe_return(self, gap: float) -> None:
+        """Record how many seconds after a departure someone came back."""
+        self.return_gaps.add(gap)
+
+    def suggest_threshold(self) -> Optional[int]:
+        """Suggest a brightness threshold separating needed from unneeded light.
+
+        The suggestion depends on the statistics only, so applying it does
+        not move the next suggestion further in the same direction.
+        """
+        needed = self.needed_lux if self.needed_lux.count >= MIN_SAMPLES else None
+        unneeded = self.unneeded_lux if self.unneeded_lux.count >= MIN_SAMPLES else None
+        if needed and unneeded:
+            suggestion = (needed.mean + unneeded.mean) / 2
+        elif needed:
+            suggestion = needed.mean + needed.std
+        elif unneeded:
+            suggestion = unneeded.mean - unneeded.std
+        else:
+            return None
+        # 阈值超出到达时的亮度范围后不再改变开灯判断，只会放大少数纠正的影响
+        if self.arrival_lux.count >= MIN_SAMPLES:
+            spread = ARRIVAL_LUX_SPREAD * self.arrival_lux.std
+            low = self.arrival_lux.mean - spread
+            high = self.arrival_lux.mean + spread
+            suggestion = min(max(suggestion, low), high)
+        return max(1, int(round(suggestion)))
+
+    def apply(self, applied: Dict[str, int], configured: Dict[str, Any]) -> None:
+        """Record applied values together with the configured values they replace."""
+        self.applied = dict(applied)
+        self.learned_from = {key: configured.get(key) for key in applied}
+
+    def discard_overridden(self, configured: Dict[str, Any]) -> List[str]:
+        """Drop applied values whose configured value changed since they were learned.
+
+        The statistics behind a dropped value are reset, so learning starts
+        again from the user's value. Returns the dropped keys.
+        """
+        overridden = []
+        for key in list(self.applied):
+            # 旧数据没有记录学习时的配置，视为未被覆盖
+            learned = self.learned_from.setdefault(key, configured.get(key))
+            if configured.get(key) == learned:
+                continue
+            overridden.append(key)
+            del self.applied[key]
+            del self.learned_from[key]
+            if key == CONF_BRIGHTNESS_THRESHOLD:
+                # 手动纠正是相对旧阈值的判断；到达时的亮度与阈值无关，保留
+                self.needed_lux = RunningStats()
+                self.unneeded_lux = RunningStats()
+            elif key == CONF_DELAY_OFF_TIME:
+                self.return_gaps = GapHistogram()
+                self.departures = 0
+        return overridden
+
+    def delay_off_cost(self, delay: int) -> float:
+        """Return the light-on seconds a delay-off time costs, counting each false off as FALSE_OFF_COST.
+
+        A return within the delay keeps the lights on for the gap; any other
+        departure keeps them on for the whole delay, and a return after the
+        lights went off counts as a false off.
+        """
+        returns = self.return_gaps.total
+        no_return = max(self.departures - returns, 0)
+        cost = no_return * delay
+        for bound, count in zip(RETURN_GAP_BINS, self.return_gaps.counts):
+            if bound <= delay:
+                cost += count * bound
+            else:
+                cost += count * (delay + FALSE_OFF_COST)
+        return cost
+
+    def suggest_delay_off(self) -> Optional[int]:
+        """Suggest the delay-off time with the least light-on time plus false-off cost."""
+        if self.return_gaps.total < MIN_SAMPLES:
+            return None
+        return min(RETURN_GAP_BINS, key=self.delay_off_cost)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return a diagnostics summary of the learned statistics."""
+        return {
+            "arrival_lux": self.arrival_lux.to_dict(),
+            "needed_lux": self.needed_lux.to_dict(),
+            "unneeded_lux": self.unneeded_lux.to_dict(),
+            "return_gaps": dict(zip(RETURN_GAP_BINS, self.return_gaps.counts)),
+            "departures": self.departures,
+            "suggested_brightness_threshold": self.suggest_threshold(),
+            "suggested_delay_off_time": self.suggest_delay_off(),
+            "applied": self.applied,
+            "learned_from": self.learned_from,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the tuner state."""
+        return {
+            "arrival_lux": self.arrival_lux.to_dict(),
+            "needed_lux": self.needed_lux.to_dict(),
+            "unneeded_lux": self.unneeded_lux.to_dict(),
+            "return_gaps": self.return_gaps.counts,
+            "departures": self.departures,
+            "applied": self.applied,
+            "learned_from": self.learned_from,
+        }
+
+    def load_dict(self, data: Dict[str, Any]) -> None:
+        """Restore a serialized tuner state."""
+        self.arrival_lux.load_dict(data.get("arrival_lux", {}))
+        self.needed_lux.load_dict(data.get("needed_lux", {}))
+        self.unneeded_lux.load_dict(data.get("unneeded_lux", {}))
+        counts = data.get("return_gaps", [])
+        # 旧数据没有 0 秒分桶
+        if len(counts) == len(RETURN_GAP_BINS) - 1:
+            counts = [0, *counts]
+        if len(counts) == len(RETURN_GAP_BINS):
+            self.return_gaps.counts = list(counts)
+        # 旧数据没有离开次数，至少等于返回次数
+        self.departures = max(int(data.get("departures", 0)), self.return_gaps.total)
+        self.applied = dict(data.get("applied", {}))
+        self.learned_from = dict(data.get("learned_from", {}))
+
+
+class TunerStore:
+    """Persist an entry's tuner state through the Home Assistant storage helper."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the store."""
+        self.tuner = ZoneTuner()
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.tuner.{entry_id}")
+
+    async def async_load(self) -> None:
+        """Load the persisted tuner state, if any."""
+        try:
+            data = await self._store.async_load()
+            if data:
+                self.tuner.load_dict(data)
+        except Exception as e:
+            _LOGGER.warning(f"加载参数调优数据失败，将重新学习: {e}")
+
+    def async_schedule_save(self) -> None:
+        """Schedule a delayed save of the tuner state."""
+        self._store.async_delay_save(self.tuner.to_dict, SAVE_DELAY)
+
+    async def async_save(self) -> None:
+        """Save the tuner state immediately."""
+        await self._store.async_save(self.tuner.to_dict())
+
+    async def async_remove(self) -> None:
+        """Remove the persisted tuner state."""
+        await self._store.async_remove()
@@ -0,0 +1,163 @@
+"""State vocabulary observation for Auto Light.
+
+In observation mode every distinct state the presence and brightness
+sensors report is counted, together with how the entry currently
+interprets it and, for states it does not know, a suggested mapping. The
+suggestions use keyword hints, which is fine here because they are only
+computed for diagnostics, never on the decision path.
+"""
+import logging
+import re
+from typing import Any, Dict, Optional
+
+from .const import BRIGHTNESS_KIND_BINARY
+from .decision import (
+    INVALID_STATES,
+    ZoneConfig,
+    is_brightness_low,
+    is_person_present,
+    parse_lux,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+ROLE_PRESENCE = "presence"
+ROLE_BRIGHTNESS = "brightness"
+
+# 每个传感器最多记录的不同状态数
+MAX_OBSERVED_STATES = 50
+# 数值亮度读数合并计数
+NUMERIC_STATE = "<numeric>"
+
+CATEGORY_PRESENT = "present"
+CATEGORY_ABSENT = "absent"
+CATEGORY_DARK = "dark"
+CATEGORY_BRIGHT = "bright"
+CATEGORY_NUMERIC = "numeric"
+CATEGORY_INVALID = "invalid"
+
+# 建议映射使用的关键词，无人关键词优先（"no motion" 也包含 "motion"），
+# 亮度状态中出现表示亮的关键词时不建议归为暗。英文关键词按整词匹配
+# （"yellow" 不含 "low"），中文关键词按子串匹配
+ABSENT_HINTS = ("no", "clear", "idle", "empty", "absent", "away", "off", "false", "无人", "离开", "空闲")
+PRESENT_HINTS = ("occupied", "present", "detected", "motion", "move", "someone", "有人", "在家", "移动")
+DARK_HINTS = ("dark", "dim", "low", "weak", "night", "暗", "黑", "夜")
+BRIGHT_HINTS = ("bright", "high", "strong", "day", "亮", "强", "白天")
+
+
+# 拆分英文单词，包括驼峰写法（"DimLight" -> "dim", "light"）
+WORD_PATTERN = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])")
+
+
+def _matches(state: str, hints: tuple) -> bool:
+    """Return True if any hint occurs in the state."""
+    words = {word.lower() for word in WORD_PATTERN.findall(state)}
+    return any(hint in words if hint.isascii() else hint in state for hint in hints)
+
+
+def _hint(
+    state: str,
+    first: tuple,
+    second: tuple,
+    first_category: Optional[str],
+    second_category: Optional[str],
+) -> Optional[str]:
+    """Return the category whose hints occur in the state, checking ``first`` first."""
+    if _matches(state, first):
+        return first_category
+    if _matches(state, second):
+        return second_category
+    return None
+
+
+class StateVocabulary:
+    """Count the distinct states of an entry's sensors and propose mappings."""
+
+    def __init__(self) -> None:
+        """Initialize an empty vocabulary."""
+        self._counts: Dict[str, Dict[str, int]] = {ROLE_PRESENCE: {}, ROLE_BRIGHTNESS: {}}
+        self.dropped = 0
+
+    def observe(self, role: str, state: Optional[str]) -> bool:
+        """Count a reported state; return True the first time it is seen."""
+        if state is None:
+            return False
+        if role == ROLE_BRIGHTNESS and parse_lux(state) is not None:
+            state = NUMERIC_STATE
+        counts = self._counts[role]
+        if state in counts:
+            counts[state] += 1
+            return False
+        if len(counts) >= MAX_OBSERVED_STATES:
+            self.dropped += 1
+            return False
+        counts[state] = 1
+        return True
+
+    def states(self, role: str) -> list:
+        """Return the distinct raw states seen for a role, most frequent first."""
+        counts = self._counts[role]
+        return [state for state in sorted(counts, key=counts.get, reverse=True) if state != NUMERIC_STATE]
+
+    @staticmethod
+    def classify(zone: ZoneConfig, role: str, state: str) -> Dict[str, Any]:
+        """Return how the zone interprets a state and, if it is not known, a suggestion."""
+        lowered = state.lower()
+        if state in INVALID_STATES:
+            return {"current": CATEGORY_INVALID, "suggested": None}
+        if role == ROLE_PRESENCE:
+            current = CATEGORY_PRESENT if is_person_present(zone, state) else CATEGORY_ABSENT
+            suggested = None
+            if lowered not in zone.present_states and lowered not in zone.absent_states:
+                suggested = _hint(state, ABSENT_HINTS, PRESENT_HINTS, CATEGORY_ABSENT, CATEGORY_PRESENT)
+            # 只建议会改变判断结果的映射
+            return {
+                "current": current,
+                "suggested": suggested if suggested != current else None,
+            }
+        if state == NUMERIC_STATE:
+            return {"current": CATEGORY_NUMERIC, "suggested": None}
+        if is_brightness_low(zone, state):
+            return {"current": CATEGORY_DARK, "suggested": None}
+        # 光线二元传感器只有 on/off，无需映射
+        if zone.brightness_kind == BRIGHTNESS_KIND_BINARY:
+            return {"current": CATEGORY_BRIGHT, "suggested": None}
+        suggested = _hint(state, BRIGHT_HINTS, DARK_HINTS, None, CATEGORY_DARK)
+        return {"current": CATEGORY_BRIGHT, "suggested": suggested}
+
+    def proposals(self, zone: ZoneConfig) -> Dict[str, list]:
+        """Return the states that should be added to each of the entry's state lists."""
+        result: Dict[str, list] = {CATEGORY_PRESENT: [], CATEGORY_ABSENT: [], CATEGORY_DARK: []}
+        for role in (ROLE_PRESENCE, ROLE_BRIGHTNESS):
+            for state in self.states(role):
+                suggested = self.classify(zone, role, state)["suggested"]
+                if suggested in result:
+                    result[suggested].append(state)
+        return result
+
+    def log_new_state(self, zone: ZoneConfig, role: str, state: str) -> None:
+        """Log a newly seen state with its interpretation."""
+        if role == ROLE_BRIGHTNESS and parse_lux(state) is not None:
+            return
+        classification = self.classify(zone, role, state)
+        if classification["suggested"] is not None:
+            _LOGGER.info(
+                f"发现未识别的{role}状态 '{state}'，当前视为 {classification['current']}，"
+                f"建议归为 {classification['suggested']}"
+            )
+        else:
+            _LOGGER.info(f"发现新的{role}状态 '{state}'，视为 {classification['current']}")
+
+    def as_dict(self, zone: ZoneConfig) -> Dict[str, Any]:
+        """Return a diagnostics summary of the observed states."""
+        return {
+            "states": {
+                role: {
+                    state: {"count": count, **self.classify(zone, role, state)}
+                    for state, count in counts.items()
+                }
+                for role, counts in self._counts.items()
+            },
+            "proposals": self.proposals(zone),
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,55 @@
+"""Zone adjacency graph for Auto Light hand-off lighting."""
+from typing import Dict, Iterable, Set, Tuple
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, DATA_ZONE_GRAPH
+
+
+class ZoneGraph:
+    """Undirected adjacency graph between config entries.
+
+    Each entry declares its own neighbors; an edge declared by either side
+    links both. Neighbor tuples are precomputed whenever the graph changes so
+    a lookup during an event is a single dict access.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty graph."""
+        self._declared: Dict[str, Set[str]] = {}
+        self._adjacency: Dict[str, Tuple[str, ...]] = {}
+
+    def set_neighbors(self, entry_id: str, neighbors: Iterable[str]) -> None:
+        """Set the neighbors declared by an entry."""
+        self._declared[entry_id] = {n for n in neighbors if n != entry_id}
+        self._rebuild()
+
+    def remove(self, entry_id: str) -> None:
+        """Remove the edges declared by an entry."""
+        self._declared.pop(entry_id, None)
+        self._rebuild()
+
+    def neighbors(self, entry_id: str) -> Tuple[str, ...]:
+        """Return the precomputed neighbors of an entry."""
+        return self._adjacency.get(entry_id, ())
+
+    def _rebuild(self) -> None:
+        """Recompute the symmetric adjacency tuples."""
+        adjacency: Dict[str, Set[str]] = {}
+        for entry_id, neighbors in self._declared.items():
+            for neighbor in neighbors:
+                adjacency.setdefault(entry_id, set()).add(neighbor)
+                adjacency.setdefault(neighbor, set()).add(entry_id)
+        self._adjacency = {
+            entry_id: tuple(sorted(neighbors)) for entry_id, neighbors in adjacency.items()
+        }
+
+
+def get_zone_graph(hass: HomeAssistant) -> ZoneGraph:
+    """Return the domain-wide zone graph, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    graph = domain_data.get(DATA_ZONE_GRAPH)
+    if graph is None:
+        graph = ZoneGraph()
+        domain_data[DATA_ZONE_GRAPH] = graph
+    return graph
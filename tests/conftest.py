@@ -0,0 +1,432 @@
+"""Minimal fake Home Assistant for the Auto Light tests.
+
+Only the parts of Home Assistant the integration touches at runtime are
+provided: a state machine that fires state change listeners, event and
+timer helpers whose removers are recorded, an in-memory store, a service
+registry that applies light calls to the state machine, and a manual
+clock. The stub modules are installed before the integration is imported.
+"""
+import asyncio
+import datetime
+import functools
+import itertools
+import math
+import os
+import sys
+import types
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+START_TIME = datetime.datetime(2024, 1, 1, 20, 0, tzinfo=datetime.timezone.utc)
+
+
+class FakeClock:
+    """Manually advanced clock behind ``homeassistant.util.dt``."""
+
+    def __init__(self) -> None:
+        self.now = START_TIME
+
+    def advance(self, seconds: float) -> None:
+        self.now += datetime.timedelta(seconds=seconds)
+
+
+CLOCK = FakeClock()
+
+
+class Remover:
+    """Remove callable of a listener or timer that records how it ended."""
+
+    _ids = itertools.count()
+
+    def __init__(self, hass: "FakeHass", kind: str, callback: Callable, **info: Any) -> None:
+        self.id = next(self._ids)
+        self.hass = hass
+        self.kind = kind
+        self.callback = callback
+        self.info = info
+        self.calls = 0
+        self.fired = False
+        hass.removers.append(self)
+
+    @property
+    def active(self) -> bool:
+        return self.calls == 0 and not self.fired
+
+    def __call__(self) -> None:
+        self.calls += 1
+
+
+class Context:
+    """Context of a state change."""
+
+    def __init__(self) -> None:
+        self.id = uuid.uuid4().hex
+
+
+class State:
+    """State object with the timestamps the integration reads."""
+
+    def __init__(
+        self,
+        entity_id: str,
+        state: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        last_updated: Optional[datetime.datetime] = None,
+        context: Optional[Context] = None,
+    ) -> None:
+        self.entity_id = entity_id
+        self.state = state
+        self.attributes = attributes or {}
+        self.last_updated = last_updated or CLOCK.now
+        self.last_reported = self.last_updated
+        self.context = context or Context()
+
+
+class Event:
+    """State change event."""
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.data = data
+
+
+class FakeStates:
+    """State machine firing the state change listeners synchronously."""
+
+    def __init__(self, hass: "FakeHass") -> None:
+        self._hass = hass
+        self._states: Dict[str, State] = {}
+        self.get_calls = 0
+
+    def get(self, entity_id: str) -> Optional[State]:
+        self.get_calls += 1
+        return self._states.get(entity_id)
+
+    def peek(self, entity_id: str) -> Optional[State]:
+        """Return a state without counting it as a read by the integration."""
+        return self._states.get(entity_id)
+
+    def async_set(
+        self,
+        entity_id: str,
+        state: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        context: Optional[Context] = None,
+    ) -> None:
+        """Write a state; an unchanged value only moves ``last_reported``, as in Home Assistant."""
+        old_state = self._states.get(entity_id)
+        if old_state is not None and old_state.state == state and attributes is None:
+            old_state.last_reported = CLOCK.now
+            return
+        new_state = State(entity_id, state, attributes, context=context)
+        self._states[entity_id] = new_state
+        event = Event({"entity_id": entity_id, "old_state": old_state, "new_state": new_state})
+        for remover in list(self._hass.removers):
+            if remover.kind == "state" and remover.active and entity_id in remover.info["entity_ids"]:
+                remover.callback(event)
+
+
+class FakeServices:
+    """Service registry; light calls are applied to the state machine.
+
+    With ``defer_feedback`` set, the resulting light state changes are held
+    back until ``take_feedback`` hands them out, so a test can deliver (and
+    time) each of them as a separate event.
+    """
+
+    def __init__(self, hass: "FakeHass") -> None:
+        self._hass = hass
+        self.calls: List[tuple] = []
+        # 每个实体最近一次服务调用的数据（不含 entity_id）
+        self.last_data: Dict[str, Dict[str, Any]] = {}
+        self.redundant_calls = 0
+        self.handlers: Dict[tuple, Callable] = {}
+        self.defer_feedback = False
+        self._feedback: List[Callable[[], None]] = []
+
+    def async_register(self, domain: str, service: str, handler: Callable, **kwargs: Any) -> None:
+        self.handlers[(domain, service)] = handler
+
+    async def async_call(
+        self, domain: str, service: str, data: Dict[str, Any], context: Optional[Context] = None
+    ) -> None:
+        entity_id = data["entity_id"]
+        self.calls.append((domain, service, entity_id))
+        self.last_data[entity_id] = {key: value for key, value in data.items() if key != "entity_id"}
+        state = "on" if service == "turn_on" else "off"
+        current = self._hass.states.peek(entity_id)
+        if current is not None and current.state == state:
+            self.redundant_calls += 1
+        feedback = functools.partial(self._hass.states.async_set, entity_id, state, context=context)
+        if self.defer_feedback:
+            self._feedback.append(feedback)
+        else:
+            feedback()
+
+    def take_feedback(self) -> List[Callable[[], None]]:
+        """Return and forget the light state changes held back so far."""
+        feedback, self._feedback = self._feedback, []
+        return feedback
+
+
+class FakeStore:
+    """In-memory replacement of ``homeassistant.helpers.storage.Store``."""
+
+    def __init__(self, hass: "FakeHass", version: int, key: str) -> None:
+        self._hass = hass
+        self.key = key
+
+    async def async_load(self) -> Any:
+        await asyncio.sleep(0)
+        return self._hass.storage.get(self.key)
+
+    async def async_save(self, data: Any) -> None:
+        await asyncio.sleep(0)
+        self._hass.storage[self.key] = data
+        self._hass.store_saves += 1
+
+    def async_delay_save(self, data_func: Callable[[], Any], delay: float = 0) -> None:
+        # 与 Home Assistant 一样只记下数据函数，卸载时的保存才真正写入
+        self.delayed = data_func
+
+    async def async_remove(self) -> None:
+        self._hass.storage.pop(self.key, None)
+
+
+class FakeConfigEntries:
+    """Config entry manager with no-op platforms."""
+
+    async def async_forward_entry_setups(self, entry: Any, platforms: List[str]) -> None:
+        await asyncio.sleep(0)
+
+    async def async_unload_platforms(self, entry: Any, platforms: List[str]) -> bool:
+        await asyncio.sleep(0)
+        return True
+
+
+class FakeConfig:
+    """Home Assistant core config."""
+
+    def path(self, *parts: str) -> str:
+        return os.path.join("/tmp", *parts)
+
+
+class FakeHass:
+    """The subset of ``HomeAssistant`` the integration uses."""
+
+    def __init__(self) -> None:
+        self.data: Dict[str, Any] = {}
+        self.removers: List[Remover] = []
+        self.storage: Dict[str, Any] = {}
+        self.store_saves = 0
+        self.states = FakeStates(self)
+        self.services = FakeServices(self)
+        self.config_entries = FakeConfigEntries()
+        self.config = FakeConfig()
+        self.loop = asyncio.get_running_loop()
+        self._tasks: set = set()
+
+    def async_create_task(self, coro: Any) -> asyncio.Task:
+        task = self.loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def async_add_executor_job(self, func: Callable, *args: Any) -> Any:
+        return func(*args)
+
+    async def async_block_till_done(self) -> None:
+        """Run the loop until no created task is pending."""
+        while True:
+            await asyncio.sleep(0)
+            if not self._tasks:
+                return
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def prune(self) -> None:
+        """Forget the listeners and timers that have ended."""
+        self.removers = self.active()
+
+    def active(self, kind: Optional[str] = None) -> List[Remover]:
+        """Return the listeners and timers that are still active."""
+        return [r for r in self.removers if r.active and (kind is None or r.kind == kind)]
+
+    def fire_timers(self, kind: str = "later") -> None:
+        """Fire the due one-shot timers (``async_call_later``) or the periodic ones of a kind."""
+        for remover in self.active(kind):
+            if kind == "later" and remover.info["due"] > CLOCK.now:
+                continue
+            if kind == "later":
+                remover.fired = True
+            remover.callback(CLOCK.now)
+
+
+class FakeConfigEntry:
+    """Config entry running its unload callbacks like Home Assistant does."""
+
+    def __init__(self, hass: FakeHass, entry_id: str, data: Dict[str, Any]) -> None:
+        self.hass = hass
+        self.entry_id = entry_id
+        self.data = data
+        self.options: Dict[str, Any] = {}
+        self._on_unload: List[Callable] = []
+        self.unloaded: List[Callable] = []
+
+    def async_on_unload(self, func: Callable) -> None:
+        self._on_unload.append(func)
+
+    def add_update_listener(self, listener: Callable) -> Remover:
+        return Remover(self.hass, "update", listener)
+
+    async def async_setup(self, integration: Any) -> bool:
+        return await integration.async_setup_entry(self.hass, self)
+
+    async def async_unload(self, integration: Any) -> bool:
+        """Unload the entry; the callbacks that ran are kept in ``unloaded``.
+
+        As in Home Assistant, a callback returning a coroutine is only
+        scheduled as a task, not awaited.
+        """
+        result = await integration.async_unload_entry(self.hass, self)
+        while self._on_unload:
+            func = self._on_unload.pop()
+            self.unloaded.append(func)
+            outcome = func()
+            if asyncio.iscoroutine(outcome):
+                self.hass.async_create_task(outcome)
+        return result
+
+
+def _track_state_change(hass: FakeHass, entity_ids: Any, action: Callable) -> Remover:
+    if isinstance(entity_ids, str):
+        entity_ids = [entity_ids]
+    return Remover(hass, "state", action, entity_ids=set(entity_ids))
+
+
+def _call_later(hass: FakeHass, delay: float, action: Callable) -> Remover:
+    return Remover(hass, "later", action, due=CLOCK.now + datetime.timedelta(seconds=delay))
+
+
+def _at_started(hass: FakeHass, action: Callable) -> Remover:
+    # Home Assistant 已启动时立即执行，返回的移除函数仍可调用
+    action(hass)
+    return Remover(hass, "started", action)
+
+
+class _AstralLocation:
+    """Location whose solar elevation follows a plain day curve peaking at noon UTC."""
+
+    def solar_elevation(self, moment: datetime.datetime, observer_elevation: float) -> float:
+        hours = moment.hour + moment.minute / 60
+        return 60 * math.sin((hours - 6) / 12 * math.pi)
+
+
+class _EntityRegistry:
+    def async_get(self, entity_id: str) -> None:
+        return None
+
+
+def _module(name: str, **attrs: Any) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
+
+
+def _callback(func: Callable) -> Callable:
+    func._hass_callback = True
+    return func
+
+
+class ServiceValidationError(Exception):
+    """Stand-in for ``homeassistant.exceptions.ServiceValidationError``."""
+
+
+def install_homeassistant_stubs() -> None:
+    """Install the stub ``homeassistant`` modules."""
+    _module("homeassistant")
+    _module("homeassistant.core", HomeAssistant=FakeHass, State=State, Context=Context,
+            ServiceCall=object, SupportsResponse=types.SimpleNamespace(ONLY="only", OPTIONAL="optional"),
+            callback=_callback)
+    _module("homeassistant.const", STATE_ON="on", STATE_OFF="off")
+    _module("homeassistant.exceptions", ServiceValidationError=ServiceValidationError)
+    _module("homeassistant.config_entries", ConfigEntry=FakeConfigEntry)
+    _module("homeassistant.components")
+    _module("homeassistant.components.light", DOMAIN="light")
+    _module("homeassistant.helpers")
+    _module("homeassistant.helpers.storage", Store=FakeStore)
+    _module("homeassistant.helpers.entity_registry", async_get=lambda hass: _EntityRegistry())
+    _module(
+        "homeassistant.helpers.event",
+        async_track_state_change_event=_track_state_change,
+        async_call_later=_call_later,
+        async_track_time_change=lambda hass, action, **kwargs: Remover(hass, "time", action, **kwargs),
+        async_track_time_interval=lambda hass, action, interval: Remover(hass, "interval", action),
+    )
+    _module("homeassistant.helpers.start", async_at_started=_at_started)
+    _module("homeassistant.helpers.sun", get_astral_location=lambda hass: (_AstralLocation(), 0))
+    _module("homeassistant.util")
+    _module(
+        "homeassistant.util.dt",
+        now=lambda: CLOCK.now,
+        utcnow=lambda: CLOCK.now,
+        as_local=lambda value: value,
+    )
+
+
+install_homeassistant_stubs()
+
+
+def pytest_configure(config) -> None:
+    config.addinivalue_line(
+        "markers", "timing: wall-clock measurements; deselect with -m 'not timing'"
+    )
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    """Reset and return the fake clock."""
+    CLOCK.now = START_TIME
+    return CLOCK
+
+
+@pytest.fixture
+def integration():
+    """Return the Auto Light integration module."""
+    from custom_components import auto_light
+
+    return auto_light
+
+
+def install_fast_queue(hass: FakeHass) -> None:
+    """Pre-create the actuation queue without rate limiting."""
+    from custom_components.auto_light.actuator import ActuationQueue
+    from custom_components.auto_light.const import DATA_ACTUATION_QUEUE, DOMAIN
+    from custom_components.auto_light.profiling import get_profiler
+
+    hass.data.setdefault(DOMAIN, {})[DATA_ACTUATION_QUEUE] = ActuationQueue(
+        hass, rate=1e6, burst=1e6, profiler=get_profiler(hass)
+    )
+
+
+def zone_config(index: int, **overrides: Any) -> Dict[str, Any]:
+    """Return the config of a single-light presence zone."""
+    config = {
+        "name": f"zone {index}",
+        "sensor_type": "presence",
+        "presence_sensor": f"binary_sensor.presence_{index}",
+        "brightness_sensor": f"sensor.lux_{index}",
+        "light_type": "single",
+        "lights": [f"light.zone_{index}"],
+        "delay_off_time": 60,
+    }
+    config.update(overrides)
+    return config
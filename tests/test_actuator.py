@@ -0,0 +1,28 @@
+"""Rate limited actuation queue."""
+import asyncio
+
+from conftest import FakeHass
+
+from custom_components.auto_light.actuator import ActuationQueue
+
+
+def test_superseded_entries_do_not_take_tokens(clock):
+    """Only commands actually sent take a token from the bridge's bucket."""
+
+    async def run() -> FakeHass:
+        hass = FakeHass()
+        # 令牌几乎不恢复：桶里的两个令牌正好够发送两条命令
+        queue = ActuationQueue(hass, rate=1e-6, burst=2)
+        # 关灯被同一灯光的开灯替换，堆中留下一条已被替换的条目
+        queue.async_enqueue("light.a", "turn_off")
+        queue.async_enqueue("light.a", "turn_on")
+        await hass.async_block_till_done()
+        queue.async_enqueue("light.b", "turn_on")
+        await asyncio.wait_for(hass.async_block_till_done(), timeout=1)
+        assert queue.sent_count == 2
+        assert queue.merged_count == 1
+        return hass
+
+    hass = asyncio.run(run())
+
+    assert hass.services.calls == [("light", "turn_on", "light.a"), ("light", "turn_on", "light.b")]
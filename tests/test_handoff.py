@@ -0,0 +1,48 @@
+"""Hand-off between neighbor zones."""
+import asyncio
+
+from conftest import FakeConfigEntry, FakeHass, install_fast_queue, zone_config
+
+from custom_components.auto_light.const import STATE_ON, STATE_OFF
+
+
+def test_arrival_does_not_prearm_the_zone_just_left(clock, integration):
+    """Walking from A to B pre-arms B but does not turn A back on."""
+
+    async def run() -> FakeHass:
+        hass = FakeHass()
+        install_fast_queue(hass)
+        for index in (1, 2):
+            hass.states.async_set(f"sensor.lux_{index}", "5", {"unit_of_measurement": "lx"})
+            hass.states.async_set(f"binary_sensor.presence_{index}", STATE_OFF)
+            hass.states.async_set(f"light.zone_{index}", STATE_OFF)
+        entries = [
+            FakeConfigEntry(hass, "a", zone_config(1, delay_off_time=0, neighbors=["b"])),
+            FakeConfigEntry(hass, "b", zone_config(2, delay_off_time=0, neighbors=["a"])),
+        ]
+        for entry in entries:
+            await entry.async_setup(integration)
+        await hass.async_block_till_done()
+
+        hass.states.async_set("binary_sensor.presence_1", STATE_ON)
+        await hass.async_block_till_done()
+        # 在 A 到达时为相邻的 B 预开灯
+        assert hass.states.get("light.zone_2").state == STATE_ON
+        clock.advance(5)
+        hass.states.async_set("binary_sensor.presence_1", STATE_OFF)
+        await hass.async_block_till_done()
+        assert hass.states.get("light.zone_1").state == STATE_OFF
+
+        clock.advance(1)
+        hass.services.calls.clear()
+        hass.states.async_set("binary_sensor.presence_2", STATE_ON)
+        await hass.async_block_till_done()
+
+        for entry in entries:
+            await entry.async_unload(integration)
+        return hass
+
+    hass = asyncio.run(run())
+
+    assert hass.states.get("light.zone_1").state == STATE_OFF
+    assert ("light", "turn_on", "light.zone_1") not in hass.services.calls
@@ -0,0 +1,317 @@
+"""Latency, allocation and call budgets of the Auto Light hot paths.
+
+Each light mode is set up as a real entry on the fake Home Assistant and
+driven through its own listeners and timers: arrivals, re-reported
+presence, departures, delayed turn-offs, periodic checks and the light
+state changes the queued service calls cause. Every event is one
+synchronous callback, timed on its own; the actuation queue is drained
+between events.
+
+Budgets are counts where possible: service calls, state reads and retained
+memory blocks per event. Latency and transient memory are compared with a
+baseline event measured in the same run, a state write no listener reacts
+to, so the budgets do not depend on the speed of the machine. The timing
+tests are marked ``timing`` and can be deselected with ``-m "not timing"``;
+``AUTO_LIGHT_LATENCY_BUDGET_US`` additionally sets an absolute p95 budget.
+"""
+import asyncio
+import datetime
+import gc
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+import pytest
+
+from conftest import CLOCK, FakeConfigEntry, FakeHass, install_fast_queue, zone_config
+
+from custom_components.auto_light.const import (
+    DOMAIN,
+    DATA_ACTUATION_QUEUE,
+    LIGHT_TYPE_SINGLE,
+    LIGHT_TYPE_MULTIPLE_PARALLEL,
+    LIGHT_TYPE_MULTIPLE_ALTERNATE,
+    STATE_ON,
+    STATE_OFF,
+)
+from custom_components.auto_light.profiling import get_profiler
+
+# 各灯光模式的区域配置
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    LIGHT_TYPE_SINGLE: {
+        "light_type": LIGHT_TYPE_SINGLE,
+        "lights": ["light.a"],
+    },
+    LIGHT_TYPE_MULTIPLE_PARALLEL: {
+        "light_type": LIGHT_TYPE_MULTIPLE_PARALLEL,
+        "lights": ["light.a", "light.b", "light.c", "light.d"],
+    },
+    LIGHT_TYPE_MULTIPLE_ALTERNATE: {
+        "light_type": LIGHT_TYPE_MULTIPLE_ALTERNATE,
+        "lights": ["light.a", "light.b", "light.c"],
+        "segments": [
+            {"profile": "weekday", "start": "07:00", "end": "23:00", "lights": ["light.a", "light.b"]},
+            {"profile": "weekend", "start": "09:00", "end": "23:00", "lights": ["light.a"], "brightness_pct": 80},
+            {"start": "23:00", "end": "07:00", "lights": ["light.c"], "brightness_pct": 10},
+        ],
+    },
+}
+
+# 预算：事件延迟 p95 与基准事件 p95 之比、单个事件的峰值临时内存与基准事件之比、
+# 每个人在事件读取状态机的次数
+LATENCY_RATIO_BUDGET = 15
+PEAK_RATIO_BUDGET = 32
+STATE_READS_BUDGET = 2
+# 解释器内部的有界缓存（例如带时区的 datetime 转字符串）会保留少量内存块，与事件数量无关；
+# 每个事件残留一个内存块就会远超此数
+RETAINED_BLOCKS_ALLOWANCE = 256
+# CI 可通过环境变量额外设置绝对的 p95 延迟预算（微秒）
+LATENCY_BUDGET_ENV = "AUTO_LIGHT_LATENCY_BUDGET_US"
+CALL_CYCLES = 200
+LATENCY_CYCLES = 1000
+# 周期数使每个事件只泄漏一个指针也会明显超出上面的余量
+MEMORY_CYCLES = 1000
+# 时间线只保留一天，预热期间写满并开始覆盖最早的记录，之后内存不再增长
+TIMELINE_DAYS = 1
+WARMUP_CYCLES = 600
+DELAY_OFF_TIME = 60
+# 每个周期时钟前进的时间：内存测量正好覆盖八天，起止时刻相同，
+# 每天的太阳照度表替换不会计入残留；延迟测量覆盖一周内的各个时间段
+CYCLE_STEP = datetime.timedelta(days=8) / MEMORY_CYCLES
+
+Measure = Callable[[str, Callable[[], None]], None]
+
+
+class ZoneDriver:
+    """One entry driven through its real listeners and timers."""
+
+    def __init__(self, hass: FakeHass, mode: str) -> None:
+        """Create the entry of a light mode with every light off and nobody present."""
+        self.hass = hass
+        self.config = zone_config(
+            0, delay_off_time=DELAY_OFF_TIME, timeline_days=TIMELINE_DAYS, **SCENARIOS[mode]
+        )
+        self.entry = FakeConfigEntry(hass, "perf", self.config)
+        self.presence_sensor = self.config["presence_sensor"]
+        self.cycles = 0
+        self.turn_on_calls = 0
+        self.turn_off_calls = 0
+        self.max_state_reads = 0
+        self._baseline_writes = 0
+
+    async def async_setup(self, integration) -> None:
+        """Set up the entry and run its initial check."""
+        hass = self.hass
+        hass.states.async_set(self.config["brightness_sensor"], "5", {"unit_of_measurement": "lx"})
+        hass.states.async_set(self.presence_sensor, STATE_OFF)
+        for light in self.config["lights"]:
+            hass.states.async_set(light, STATE_OFF)
+        install_fast_queue(hass)
+        await self.entry.async_setup(integration)
+        hass.services.defer_feedback = True
+        hass.fire_timers()
+        await self._async_drain(lambda name, func: func())
+
+    async def _async_drain(self, measure: Measure) -> None:
+        """Let the queue send its calls, then deliver each light state change as an event."""
+        await self.hass.async_block_till_done()
+        for feedback in self.hass.services.take_feedback():
+            measure("light_change", feedback)
+
+    async def _async_step(self, measure: Measure, name: str, func: Callable[[], None]) -> None:
+        measure(name, func)
+        await self._async_drain(measure)
+
+    def _presence(self, state: str, attributes=None) -> Callable[[], None]:
+        def set_presence() -> None:
+            before = self.hass.states.get_calls
+            self.hass.states.async_set(self.presence_sensor, state, attributes)
+            self.max_state_reads = max(self.max_state_reads, self.hass.states.get_calls - before)
+
+        return set_presence
+
+    def baseline(self) -> None:
+        """Write a state no listener reacts to: the cost of the fake itself."""
+        self._baseline_writes += 1
+        self.hass.states.async_set("sensor.baseline", str(self._baseline_writes))
+
+    async def async_cycle(self, measure: Measure) -> None:
+        """Run one arrival/departure cycle, preceded by a baseline event."""
+        hass = self.hass
+        measure("baseline", self.baseline)
+        await self._async_step(measure, "arrival", self._presence(STATE_ON))
+        # 传感器带着新属性重复上报有人，灯已打开，不应再发出服务调用
+        await self._async_step(measure, "repeat", self._presence(STATE_ON, {"cycle": self.cycles}))
+        await self._async_step(measure, "periodic_check", lambda: hass.fire_timers("interval"))
+        await self._async_step(measure, "departure", self._presence(STATE_OFF))
+        CLOCK.advance(DELAY_OFF_TIME)
+        await self._async_step(measure, "delay_off", hass.fire_timers)
+        await self._async_step(measure, "periodic_check", lambda: hass.fire_timers("interval"))
+        CLOCK.advance(CYCLE_STEP.total_seconds() - DELAY_OFF_TIME)
+
+        for _, service, _ in hass.services.calls:
+            if service == "turn_on":
+                self.turn_on_calls += 1
+            else:
+                self.turn_off_calls += 1
+        hass.services.calls.clear()
+        hass.prune()
+        self.cycles += 1
+
+    def max_active_lights(self) -> int:
+        """Return the most lights any segment turns on at once."""
+        segments = self.config.get("segments")
+        if segments:
+            return max(len(segment["lights"]) for segment in segments)
+        return len(self.config["lights"])
+
+
+def _run(mode: str, integration, body: Callable[[ZoneDriver], Any]) -> Any:
+    """Set up a zone of the given mode and run the async body against it."""
+
+    async def run() -> Any:
+        hass = FakeHass()
+        driver = ZoneDriver(hass, mode)
+        await driver.async_setup(integration)
+        try:
+            return await body(driver)
+        finally:
+            await driver.entry.async_unload(integration)
+
+    return asyncio.run(run())
+
+
+@pytest.fixture(autouse=True)
+def quiet_logging():
+    """Keep log output out of the measurements; the messages are still formatted."""
+    logging.disable(logging.CRITICAL)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def _p95(samples: List[float]) -> float:
+    return sorted(samples)[int(len(samples) * 0.95)]
+
+
+@pytest.mark.parametrize("mode", list(SCENARIOS))
+def test_calls_and_state_reads(mode, clock, integration):
+    """Every event sends no needless calls and reads only the sensor states."""
+
+    async def body(driver: ZoneDriver) -> ZoneDriver:
+        for _ in range(CALL_CYCLES):
+            await driver.async_cycle(lambda name, func: func())
+        return driver
+
+    driver = _run(mode, integration, body)
+
+    # 每次到达最多为当前时段的每个灯光开一次灯，每次离开最多为每个灯光关一次灯
+    assert 0 < driver.turn_on_calls / driver.cycles <= driver.max_active_lights()
+    assert 0 < driver.turn_off_calls / driver.cycles <= len(driver.config["lights"])
+    assert driver.hass.services.redundant_calls == 0
+    # 快照只读取传感器状态，灯光状态来自订阅维护的缓存
+    assert driver.max_state_reads <= STATE_READS_BUDGET
+
+
+@pytest.mark.timing
+@pytest.mark.parametrize("mode", list(SCENARIOS))
+def test_latency(mode, clock, integration):
+    """The p95 event latency stays within a multiple of the baseline event's."""
+    samples: Dict[str, List[float]] = {}
+
+    def measure(name: str, func: Callable[[], None]) -> None:
+        start = time.perf_counter()
+        func()
+        samples.setdefault(name, []).append(time.perf_counter() - start)
+
+    async def body(driver: ZoneDriver) -> None:
+        for _ in range(LATENCY_CYCLES):
+            await driver.async_cycle(measure)
+
+    _run(mode, integration, body)
+
+    baseline = _p95(samples.pop("baseline"))
+    assert set(samples) == {
+        "arrival", "repeat", "periodic_check", "departure", "delay_off", "light_change"
+    }
+    p95 = _p95([elapsed for values in samples.values() for elapsed in values])
+    report = {name: round(_p95(values) * 1e6, 1) for name, values in samples.items()}
+    assert p95 <= LATENCY_RATIO_BUDGET * baseline, (baseline * 1e6, report)
+    budget_us = os.environ.get(LATENCY_BUDGET_ENV)
+    if budget_us:
+        assert p95 * 1e6 <= float(budget_us), report
+
+
+@pytest.mark.parametrize("mode", list(SCENARIOS))
+def test_memory(mode, clock, integration):
+    """Events stay within the transient memory budget and retain no memory blocks.
+
+    Tracing starts before the entry is set up, so replacing an entry of a
+    ring buffer or a bounded history frees as much as it allocates. The
+    warm-up fills the occupancy timeline up to its retention first.
+    """
+    peaks: Dict[str, int] = {}
+
+    def measure(name: str, func: Callable[[], None]) -> None:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        func()
+        peaks[name] = max(peaks.get(name, 0), tracemalloc.get_traced_memory()[1] - before)
+
+    async def body(driver: ZoneDriver) -> int:
+        for _ in range(WARMUP_CYCLES):
+            await driver.async_cycle(lambda name, func: func())
+        gc.collect()
+        start = sys.getallocatedblocks()
+        for _ in range(MEMORY_CYCLES):
+            await driver.async_cycle(measure)
+        gc.collect()
+        return sys.getallocatedblocks() - start
+
+    tracemalloc.start()
+    try:
+        retained = _run(mode, integration, body)
+    finally:
+        tracemalloc.stop()
+
+    baseline = peaks.pop("baseline")
+    assert max(peaks.values()) <= PEAK_RATIO_BUDGET * baseline, (baseline, peaks)
+    assert retained <= RETAINED_BLOCKS_ALLOWANCE
+
+
+def test_profiler_fills_histograms_only_when_enabled(clock, integration):
+    """The hot paths report to the profiler while it runs and cost only a flag check otherwise."""
+
+    async def body(driver: ZoneDriver) -> Dict[str, Any]:
+        profiler = get_profiler(driver.hass)
+        for _ in range(5):
+            await driver.async_cycle(lambda name, func: func())
+        assert profiler.histograms == {}
+
+        profiler.start()
+        for _ in range(20):
+            await driver.async_cycle(lambda name, func: func())
+        report = profiler.stop()
+
+        for _ in range(5):
+            await driver.async_cycle(lambda name, func: func())
+        assert {name: h.count for name, h in profiler.histograms.items()} == {
+            name: timing["count"] for name, timing in report["timings"].items()
+        }
+        assert driver.hass.data[DOMAIN][DATA_ACTUATION_QUEUE].sent_count > 0
+        return report
+
+    report = _run(LIGHT_TYPE_MULTIPLE_PARALLEL, integration, body)
+
+    timings = report["timings"]
+    for name in (
+        "presence_change", "light_change", "delay_off", "periodic_check", "execute",
+        "queue_wait", "service_turn_on", "service_turn_off",
+    ):
+        assert timings[name]["count"] > 0, name
+    # 每个周期到达和离开各一次，另有一次带新属性的重复上报
+    assert timings["presence_change"]["count"] == 3 * 20
+    assert timings["delay_off"]["count"] == 20
+    assert timings["service_turn_on"]["count"] == 4 * 20
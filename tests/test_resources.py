@@ -0,0 +1,145 @@
+"""Entries release every listener, timer and store they create."""
+import asyncio
+
+from conftest import FakeConfigEntry, FakeHass, Remover, install_fast_queue, zone_config
+
+from custom_components.auto_light.const import DOMAIN
+
+ENTRY_COUNT = 200
+
+
+def _setup_states(hass: FakeHass) -> None:
+    for index in range(ENTRY_COUNT):
+        hass.states.async_set(f"sensor.lux_{index}", "5", {"unit_of_measurement": "lx"})
+        hass.states.async_set(f"binary_sensor.presence_{index}", "off")
+        hass.states.async_set(f"light.zone_{index}", "off")
+
+
+def _entries(hass: FakeHass):
+    entries = []
+    for index in range(ENTRY_COUNT):
+        # 相邻区域成对出现，一半条目开启参数调优
+        neighbor = index + 1 if index % 2 == 0 else index - 1
+        config = zone_config(
+            index,
+            neighbors=[f"entry_{neighbor}"],
+            tuning_mode="apply" if index % 2 else "off",
+        )
+        entries.append(FakeConfigEntry(hass, f"entry_{index}", config))
+    return entries
+
+
+async def _setup_all(hass: FakeHass, integration, entries, resources) -> None:
+    # 最后一个条目卸载时会停止命令队列，每次设置前重新创建不限流的队列
+    install_fast_queue(hass)
+    await asyncio.gather(*(entry.async_setup(integration) for entry in entries))
+    for entry in entries:
+        resources.append(hass.data[DOMAIN][entry.entry_id]["state"]["resources"])
+
+
+async def _exercise(hass: FakeHass, clock) -> None:
+    """Leave delay-off timers pending in some zones and let others fire."""
+    for index in range(ENTRY_COUNT):
+        hass.states.async_set(f"binary_sensor.presence_{index}", "on")
+    await hass.async_block_till_done()
+    for index in range(0, ENTRY_COUNT, 2):
+        hass.states.async_set(f"binary_sensor.presence_{index}", "off")
+    await hass.async_block_till_done()
+    clock.advance(120)
+    hass.fire_timers()
+    await hass.async_block_till_done()
+    for index in range(0, ENTRY_COUNT, 4):
+        hass.states.async_set(f"binary_sensor.presence_{index}", "on")
+        hass.states.async_set(f"binary_sensor.presence_{index}", "off")
+    await hass.async_block_till_done()
+
+
+def test_setup_reload_unload_releases_everything(clock, integration):
+    """Concurrent setup, reload and a repeated unload leave nothing behind."""
+
+    async def run() -> FakeHass:
+        hass = FakeHass()
+        _setup_states(hass)
+        entries = _entries(hass)
+        resources = []
+
+        await _setup_all(hass, integration, entries, resources)
+        await _exercise(hass, clock)
+        assert hass.active("later")
+
+        # 重新加载：先卸载再设置，所有条目并发进行
+        await asyncio.gather(*(entry.async_unload(integration) for entry in entries))
+        await _setup_all(hass, integration, entries, resources)
+        await _exercise(hass, clock)
+
+        await asyncio.gather(*(entry.async_unload(integration) for entry in entries))
+        # 再次卸载并重复执行集成注册的释放回调，释放必须是幂等的
+        await asyncio.gather(*(entry.async_unload(integration) for entry in entries))
+        for entry in entries:
+            for func in entry.unloaded:
+                if not isinstance(func, Remover):
+                    func()
+        await hass.async_block_till_done()
+
+        assert len(resources) == 2 * ENTRY_COUNT
+        for entry_resources in resources:
+            assert entry_resources.released
+            assert entry_resources.names == []
+        return hass
+
+    hass = asyncio.run(run())
+
+    assert hass.data[DOMAIN] == {}
+    assert not hass.active()
+    for remover in hass.removers:
+        # 每个移除函数恰好调用一次；已触发的定时器不应再被移除
+        assert remover.calls + remover.fired == 1, (remover.kind, remover.info)
+    assert any(remover.fired for remover in hass.removers)
+    assert all(key.startswith(DOMAIN) for key in hass.storage)
+    assert len(hass.storage) == ENTRY_COUNT + ENTRY_COUNT // 2
+
+
+def test_track_after_release_removes_immediately(clock, integration):
+    """A timer scheduled by a callback racing with the unload is removed at once."""
+
+    async def run() -> None:
+        hass = FakeHass()
+        _setup_states(hass)
+        entry = _entries(hass)[0]
+        await entry.async_setup(integration)
+        resources = hass.data[DOMAIN][entry.entry_id]["state"]["resources"]
+        await entry.async_unload(integration)
+
+        late = Remover(hass, "later", lambda now: None)
+        resources.track("delay_off", late)
+        assert late.calls == 1
+        assert resources.names == []
+
+    asyncio.run(run())
+
+
+def test_reload_loads_what_the_unload_saved(clock, integration):
+    """The stores are saved before the unload returns, so a reload reads the latest records."""
+
+    async def run() -> None:
+        hass = FakeHass()
+        _setup_states(hass)
+        install_fast_queue(hass)
+        entry = _entries(hass)[1]
+        await entry.async_setup(integration)
+        hass.states.async_set("binary_sensor.presence_1", "on")
+        await hass.async_block_till_done()
+        state = hass.data[DOMAIN][entry.entry_id]["state"]
+        recorded = len(state["timeline_store"].timeline)
+        assert recorded > 0
+
+        # 卸载后立即重新设置，不等待其他任务
+        await entry.async_unload(integration)
+        install_fast_queue(hass)
+        await entry.async_setup(integration)
+        state = hass.data[DOMAIN][entry.entry_id]["state"]
+        assert len(state["timeline_store"].timeline) == recorded
+        assert "tuner_store" in state
+        await entry.async_unload(integration)
+
+    asyncio.run(run())
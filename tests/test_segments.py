@@ -0,0 +1,94 @@
+"""Time segments of the multiple_alternate light mode."""
+import asyncio
+from typing import Any, Dict, List
+
+from conftest import FakeConfigEntry, FakeHass, install_fast_queue, zone_config
+
+from custom_components.auto_light.const import LIGHT_TYPE_MULTIPLE_ALTERNATE, STATE_ON, STATE_OFF
+
+LIGHTS = ["light.a", "light.b", "light.c"]
+
+
+def _run(clock, integration, segments: List[Dict[str, Any]], steps) -> FakeHass:
+    """Set up an alternate zone, let someone arrive at 20:00 and run the steps."""
+
+    async def run() -> FakeHass:
+        hass = FakeHass()
+        install_fast_queue(hass)
+        hass.states.async_set("sensor.lux_0", "5", {"unit_of_measurement": "lx"})
+        hass.states.async_set("binary_sensor.presence_0", STATE_OFF)
+        for light in LIGHTS:
+            hass.states.async_set(light, STATE_OFF)
+        entry = FakeConfigEntry(
+            hass,
+            "alternate",
+            zone_config(0, light_type=LIGHT_TYPE_MULTIPLE_ALTERNATE, lights=LIGHTS, segments=segments),
+        )
+        await entry.async_setup(integration)
+        hass.states.async_set("binary_sensor.presence_0", STATE_ON)
+        await hass.async_block_till_done()
+        await steps(hass)
+        await entry.async_unload(integration)
+        return hass
+
+    return asyncio.run(run())
+
+
+def _light_states(hass: FakeHass) -> Dict[str, str]:
+    return {light: hass.states.peek(light).state for light in LIGHTS}
+
+
+def test_periodic_check_switches_to_the_next_segment(clock, integration):
+    """Crossing 23:00 while someone is present moves the lights to the night segment."""
+    segments = [
+        {"start": "07:00", "end": "23:00", "lights": ["light.a", "light.b"]},
+        {"start": "23:00", "end": "07:00", "lights": ["light.c"], "brightness_pct": 10},
+    ]
+
+    async def steps(hass: FakeHass) -> None:
+        assert _light_states(hass) == {"light.a": STATE_ON, "light.b": STATE_ON, "light.c": STATE_OFF}
+        # 时间段未变时，不关闭手动打开的其他灯光
+        hass.states.async_set("light.c", STATE_ON)
+        clock.advance(60 * 60)
+        hass.fire_timers("interval")
+        await hass.async_block_till_done()
+        assert _light_states(hass) == {"light.a": STATE_ON, "light.b": STATE_ON, "light.c": STATE_ON}
+
+        hass.states.async_set("light.c", STATE_OFF)
+        clock.advance(2 * 60 * 60 + 5 * 60)
+        hass.services.calls.clear()
+        hass.fire_timers("interval")
+        await hass.async_block_till_done()
+
+    hass = _run(clock, integration, segments, steps)
+
+    assert _light_states(hass) == {"light.a": STATE_OFF, "light.b": STATE_OFF, "light.c": STATE_ON}
+    assert hass.services.last_data["light.c"] == {"brightness_pct": 10}
+    assert sorted(hass.services.calls) == [
+        ("light", "turn_off", "light.a"),
+        ("light", "turn_off", "light.b"),
+        ("light", "turn_on", "light.c"),
+    ]
+
+
+def test_periodic_check_resends_changed_segment_data(clock, integration):
+    """A light on in both segments gets the new segment's brightness at the boundary."""
+    segments = [
+        {"start": "07:00", "end": "23:00", "lights": ["light.a"], "brightness_pct": 80},
+        {"start": "23:00", "end": "07:00", "lights": ["light.a"], "brightness_pct": 10},
+    ]
+
+    async def steps(hass: FakeHass) -> None:
+        assert hass.services.last_data["light.a"] == {"brightness_pct": 80}
+        clock.advance(3 * 60 * 60 + 5 * 60)
+        hass.services.calls.clear()
+        hass.fire_timers("interval")
+        await hass.async_block_till_done()
+        # 之后的定期检查不再重复发送
+        hass.fire_timers("interval")
+        await hass.async_block_till_done()
+
+    hass = _run(clock, integration, segments, steps)
+
+    assert hass.services.calls == [("light", "turn_on", "light.a")]
+    assert hass.services.last_data["light.a"] == {"brightness_pct": 10}
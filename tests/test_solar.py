@@ -0,0 +1,47 @@
+"""Daily solar lux table of the shared estimator."""
+import asyncio
+import datetime
+
+from conftest import START_TIME, FakeHass
+
+from custom_components.auto_light.solar import SolarLuxEstimator
+
+NEXT_DAY = START_TIME + datetime.timedelta(days=1)
+
+
+def test_one_table_build_at_a_time(clock):
+    """A new day waits for the running build instead of starting a second one."""
+
+    async def run() -> None:
+        hass = FakeHass()
+        estimator = SolarLuxEstimator(hass, 0.02)
+        estimator.estimate(START_TIME)
+        estimator.estimate(NEXT_DAY)
+        assert len(hass._tasks) == 1
+        await hass.async_block_till_done()
+        assert estimator._date == START_TIME.date()
+
+        # 上一张表完成后，新的一天才开始计算
+        estimator.estimate(NEXT_DAY)
+        assert len(hass._tasks) == 1
+        await hass.async_block_till_done()
+        assert estimator._date == NEXT_DAY.date()
+        assert estimator._table is not None
+
+    asyncio.run(run())
+
+
+def test_cancel_stops_the_running_build(clock):
+    """Releasing the estimator cancels its build, which then installs nothing."""
+
+    async def run() -> None:
+        hass = FakeHass()
+        estimator = SolarLuxEstimator(hass, 0.02)
+        estimator.estimate(START_TIME)
+        (task,) = hass._tasks
+        estimator.async_cancel()
+        await hass.async_block_till_done()
+        assert task.cancelled()
+        assert estimator._table is None
+
+    asyncio.run(run())
@@ -0,0 +1,111 @@
+"""Threshold and delay-off suggestions of the zone tuner."""
+import asyncio
+
+from conftest import FakeConfigEntry, FakeHass, install_fast_queue, zone_config
+
+from custom_components.auto_light.const import DOMAIN
+from custom_components.auto_light.tuner import MIN_SAMPLES, RETURN_GAP_BINS, ZoneTuner
+
+
+def test_threshold_suggestion_depends_on_statistics_only():
+    """Manual turn-ons alone suggest the same threshold however often it is applied."""
+    tuner = ZoneTuner()
+    for lux in range(100, 100 + MIN_SAMPLES):
+        tuner.observe_manual_on(lux)
+
+    suggestion = tuner.suggest_threshold()
+
+    assert suggestion == round(tuner.needed_lux.mean + tuner.needed_lux.std)
+    assert tuner.suggest_threshold() == suggestion
+
+
+def test_zero_delay_suggested_when_nobody_returns_soon():
+    """Returns long after leaving make turning off at once the cheapest choice."""
+    tuner = ZoneTuner()
+    for _ in range(MIN_SAMPLES):
+        tuner.observe_departure()
+        tuner.observe_return(RETURN_GAP_BINS[-1])
+
+    assert tuner.suggest_delay_off() == 0
+
+
+def test_histogram_without_zero_bin_is_restored():
+    """Stored counts from before the 0 s bin keep their bins."""
+    tuner = ZoneTuner()
+    counts = list(range(1, len(RETURN_GAP_BINS)))
+
+    tuner.load_dict({"return_gaps": counts})
+
+    assert tuner.return_gaps.counts == [0, *counts]
+
+
+def _learned_tuner() -> ZoneTuner:
+    tuner = ZoneTuner()
+    for _ in range(MIN_SAMPLES):
+        tuner.observe_manual_on(100)
+        tuner.observe_arrival(50)
+        tuner.observe_departure()
+        tuner.observe_return(RETURN_GAP_BINS[-1])
+    return tuner
+
+
+def test_override_drops_applied_value_and_its_statistics():
+    """A configured value changed after applying starts learning that parameter again."""
+    tuner = _learned_tuner()
+    tuner.apply(
+        {"brightness_threshold": 110, "delay_off_time": 0},
+        {"brightness_threshold": 60, "delay_off_time": 60},
+    )
+
+    overridden = tuner.discard_overridden({"brightness_threshold": 60, "delay_off_time": 120})
+
+    assert overridden == ["delay_off_time"]
+    assert tuner.applied == {"brightness_threshold": 110}
+    assert tuner.learned_from == {"brightness_threshold": 60}
+    assert tuner.return_gaps.total == 0 and tuner.departures == 0
+    assert tuner.needed_lux.count == MIN_SAMPLES
+
+
+def test_threshold_override_keeps_arrival_statistics():
+    """Arrival lux does not depend on the threshold and survives an override."""
+    tuner = _learned_tuner()
+    tuner.apply({"brightness_threshold": 110}, {})
+
+    assert tuner.discard_overridden({"brightness_threshold": 80}) == ["brightness_threshold"]
+    assert tuner.applied == {}
+    assert tuner.needed_lux.count == 0
+    assert tuner.arrival_lux.count == MIN_SAMPLES
+
+
+def test_setup_applies_learned_values_unless_overridden(clock, integration):
+    """Apply mode uses the learned delay only while the user keeps the value it replaced."""
+
+    async def run(configured_delay: int) -> dict:
+        hass = FakeHass()
+        hass.storage[f"{DOMAIN}.tuner.entry"] = {
+            "departures": MIN_SAMPLES,
+            "return_gaps": [0] * (len(RETURN_GAP_BINS) - 1) + [MIN_SAMPLES],
+            "applied": {"delay_off_time": 0},
+            "learned_from": {"delay_off_time": 60},
+        }
+        install_fast_queue(hass)
+        entry = FakeConfigEntry(
+            hass, "entry", zone_config(0, delay_off_time=configured_delay, tuning_mode="apply")
+        )
+        await entry.async_setup(integration)
+        entry_data = hass.data[DOMAIN]["entry"]
+        result = {
+            "delay_off_time": entry_data["config"]["delay_off_time"],
+            "tuner": entry_data["state"]["tuner_store"].tuner,
+        }
+        await entry.async_unload(integration)
+        return result
+
+    kept = asyncio.run(run(60))
+    assert kept["delay_off_time"] == 0
+    assert kept["tuner"].departures == MIN_SAMPLES
+
+    overridden = asyncio.run(run(120))
+    assert overridden["delay_off_time"] == 120
+    assert overridden["tuner"].applied == {}
+    assert overridden["tuner"].departures == 0
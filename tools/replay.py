@@ -0,0 +1,352 @@
+"""Replay exported recorder history through the Auto Light decision core.
+
+Usage, from the repository root::
+
+    python -m tools.replay history.json --config zone.json
+    python -m tools.replay history.csv --config zone.json \\
+        --delay-off-time 120 --brightness-threshold 40
+
+``history`` is a CSV download from the history panel (``entity_id``, ``state``,
+``last_changed``) or the JSON returned by the ``/api/history/period`` endpoint.
+``zone.json`` holds the entry config, e.g. the ``config`` section of the
+integration diagnostics. The replay runs on a virtual clock, so days of
+history are evaluated in seconds. Importing the integration package needs
+the ``homeassistant`` package, as in a Home Assistant development setup; no
+running instance is needed.
+"""
+import argparse
+import csv
+import datetime
+import json
+import sys
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from custom_components.auto_light.const import (
+    CONF_PRESENCE_SENSOR,
+    CONF_BRIGHTNESS_SENSOR,
+    CONF_BRIGHTNESS_THRESHOLD,
+    CONF_DELAY_OFF_TIME,
+    DEFAULT_DAYLIGHT_FACTOR,
+    STATE_ON,
+    STATE_OFF,
+)
+from custom_components.auto_light.decision import (
+    ZoneConfig,
+    Inputs,
+    RuntimeState,
+    TurnOn,
+    TurnOff,
+    SetSegment,
+    ScheduleDelayOff,
+    Transition,
+    decide_presence_change,
+    decide_delay_off_expired,
+    decide_periodic,
+    detect_brightness_kind,
+)
+from custom_components.auto_light.schedule import Segment
+from custom_components.auto_light.solar import SUN_ENTITY, estimate_indoor_lux
+
+# 与集成中的定期检查间隔一致
+PERIODIC_INTERVAL = datetime.timedelta(minutes=10)
+# 自动关灯后多久内有人返回视为误关灯（秒）
+DEFAULT_FALSE_OFF_WINDOW = 60
+
+
+class HistoryEvent(NamedTuple):
+    """One recorded state of an entity."""
+
+    time: datetime.datetime
+    entity_id: str
+    state: str
+    attributes: Dict[str, Any]
+
+
+def _parse_time(value: str) -> datetime.datetime:
+    """Parse an ISO timestamp, assuming UTC when no offset is given."""
+    parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
+
+
+def load_history(path: str) -> List[HistoryEvent]:
+    """Load a CSV or JSON history export, sorted by time."""
+    events = []
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as csv_file:
+            for row in csv.DictReader(csv_file):
+                timestamp = row.get("last_reported") or row.get("last_updated") or row["last_changed"]
+                events.append(HistoryEvent(_parse_time(timestamp), row["entity_id"], row["state"], {}))
+    else:
+        with open(path, encoding="utf-8") as json_file:
+            data = json.load(json_file)
+        if isinstance(data, dict):
+            data = [
+                [dict(item, entity_id=entity_id) for item in items]
+                for entity_id, items in data.items()
+            ]
+        elif data and isinstance(data[0], dict):
+            data = [data]
+        for series in data:
+            entity_id = None
+            for item in series:
+                # minimal_response 只在第一条记录中包含 entity_id
+                entity_id = item.get("entity_id", entity_id)
+                timestamp = item.get("last_reported") or item.get("last_updated") or item["last_changed"]
+                events.append(
+                    HistoryEvent(
+                        _parse_time(timestamp),
+                        entity_id,
+                        item["state"],
+                        item.get("attributes") or {},
+                    )
+                )
+    events.sort(key=lambda event: event.time)
+    return events
+
+
+class ReplaySimulator:
+    """Drive the decision core with recorded events on a virtual clock."""
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        tz: datetime.tzinfo,
+        false_off_window: float = DEFAULT_FALSE_OFF_WINDOW,
+        daylight_factor: float = DEFAULT_DAYLIGHT_FACTOR,
+    ) -> None:
+        """Initialize the simulator for one zone."""
+        self.config = config
+        self.zone = ZoneConfig(config)
+        self.presence_sensor = config.get(CONF_PRESENCE_SENSOR)
+        self.brightness_sensor = config.get(CONF_BRIGHTNESS_SENSOR)
+        self.tz = tz
+        self.false_off_window = false_off_window
+        self.daylight_factor = daylight_factor
+
+        self.clock: Optional[datetime.datetime] = None
+        self.presence_state: Optional[str] = None
+        self.presence_updated: Optional[datetime.datetime] = None
+        self.brightness_state: Optional[str] = None
+        self.brightness_updated: Optional[datetime.datetime] = None
+        self.sun_lux: Optional[float] = None
+        # 没有记录的灯光视为关闭
+        self.light_states: Dict[str, Optional[str]] = {light: STATE_OFF for light in self.zone.lights}
+        self._seen_lights: set = set()
+        self.delay_off_deadline: Optional[datetime.datetime] = None
+        self.applied_segment: Optional[Segment] = None
+        self.next_periodic: Optional[datetime.datetime] = None
+
+        self._on_since: Dict[str, datetime.datetime] = {}
+        self._recorded_on_since: Dict[str, datetime.datetime] = {}
+        self._last_auto_off: Optional[datetime.datetime] = None
+        self.light_on_seconds = 0.0
+        self.recorded_light_on_seconds = 0.0
+        self.service_calls = 0
+        self.turn_on_calls = 0
+        self.turn_off_calls = 0
+        self.false_offs = 0
+        self.arrivals = 0
+        self.events = 0
+
+    def _inputs(self) -> Inputs:
+        """Build the decision snapshot from the simulated states."""
+        return Inputs(
+            presence_state=self.presence_state,
+            presence_updated=self.presence_updated,
+            brightness_state=self.brightness_state,
+            brightness_updated=self.brightness_updated,
+            light_states=self.light_states,
+            sun_lux=self.sun_lux,
+        )
+
+    def _runtime(self) -> RuntimeState:
+        """Return the simulated runtime state."""
+        return RuntimeState(
+            enabled=True,
+            delay_off_deadline=self.delay_off_deadline,
+            applied_segment=self.applied_segment,
+        )
+
+    def _local_now(self) -> datetime.datetime:
+        """Return the virtual clock in the configured time zone."""
+        return self.clock.astimezone(self.tz)
+
+    def _execute(self, actions: Iterable[Any]) -> None:
+        """Apply the actions to the simulated world."""
+        for action in actions:
+            kind = type(action)
+            if kind is TurnOn:
+                self.service_calls += 1
+                self.turn_on_calls += 1
+                if self.light_states.get(action.entity_id) != STATE_ON:
+                    self._on_since[action.entity_id] = self.clock
+                self.light_states[action.entity_id] = STATE_ON
+            elif kind is TurnOff:
+                self.service_calls += 1
+                self.turn_off_calls += 1
+                self._close_on_time(action.entity_id)
+                self.light_states[action.entity_id] = STATE_OFF
+                self._last_auto_off = self.clock
+            elif kind is SetSegment:
+                self.applied_segment = action.segment
+            elif kind is ScheduleDelayOff:
+                self.delay_off_deadline = self.clock + datetime.timedelta(seconds=action.delay)
+            elif kind is Transition and action.presence:
+                self.arrivals += 1
+                if (
+                    self._last_auto_off is not None
+                    and (self.clock - self._last_auto_off).total_seconds() <= self.false_off_window
+                ):
+                    self.false_offs += 1
+
+    def _close_on_time(self, light: str) -> None:
+        """Add the simulated on-time of a light up to the current clock."""
+        since = self._on_since.pop(light, None)
+        if since is not None:
+            self.light_on_seconds += (self.clock - since).total_seconds()
+
+    def _advance(self, until: datetime.datetime) -> None:
+        """Fire the timers due before ``until`` in order."""
+        while True:
+            due = [t for t in (self.delay_off_deadline, self.next_periodic) if t is not None]
+            if not due or min(due) > until:
+                break
+            self.clock = min(due)
+            if self.delay_off_deadline is not None and self.clock == self.delay_off_deadline:
+                self.delay_off_deadline = None
+                self._execute(decide_delay_off_expired(self.zone, self._inputs()))
+            else:
+                self.next_periodic = self.clock + PERIODIC_INTERVAL
+                self._execute(decide_periodic(self.zone, self._inputs(), self._runtime(), self._local_now()))
+        self.clock = until
+
+    def _apply(self, event: HistoryEvent) -> None:
+        """Feed one recorded event to the simulation."""
+        if event.entity_id == self.presence_sensor:
+            old_state = self.presence_state
+            self.presence_state = event.state
+            self.presence_updated = event.time
+            self._execute(
+                decide_presence_change(
+                    self.zone, self._inputs(), self._runtime(), old_state, self._local_now()
+                )
+            )
+        elif event.entity_id == self.brightness_sensor:
+            self.brightness_state = event.state
+            self.brightness_updated = event.time
+        elif event.entity_id == SUN_ENTITY:
+            try:
+                self.sun_lux = estimate_indoor_lux(
+                    float(event.attributes["elevation"]), self.daylight_factor
+                )
+            except (KeyError, ValueError, TypeError):
+                pass
+        elif event.entity_id in self.light_states:
+            # 记录实际灯光状态，用于与模拟结果对比；首次出现时作为模拟的初始状态
+            if event.entity_id not in self._seen_lights:
+                self._seen_lights.add(event.entity_id)
+                self.light_states[event.entity_id] = event.state
+                if event.state == STATE_ON:
+                    self._on_since[event.entity_id] = event.time
+            if event.state == STATE_ON and event.entity_id not in self._recorded_on_since:
+                self._recorded_on_since[event.entity_id] = event.time
+            elif event.state != STATE_ON and event.entity_id in self._recorded_on_since:
+                since = self._recorded_on_since.pop(event.entity_id)
+                self.recorded_light_on_seconds += (event.time - since).total_seconds()
+
+    def _detect_brightness_kind(self, events: List[HistoryEvent]) -> None:
+        """Choose the brightness comparator from the recorded attributes, as setup does."""
+        attributes: Dict[str, Any] = {}
+        for event in events:
+            if event.entity_id == self.brightness_sensor and event.attributes:
+                attributes = event.attributes
+                break
+        kind = detect_brightness_kind(
+            str(self.brightness_sensor).split(".")[0],
+            attributes.get("device_class"),
+            attributes.get("unit_of_measurement"),
+            attributes.get("state_class"),
+            attributes.get("options"),
+        )
+        self.zone = ZoneConfig(self.config, kind)
+
+    def run(self, events: List[HistoryEvent]) -> Dict[str, Any]:
+        """Replay the events and return the report."""
+        if not events:
+            return self.report()
+        self._detect_brightness_kind(events)
+        self.clock = events[0].time
+        self.next_periodic = self.clock
+        for event in events:
+            self._advance(event.time)
+            self._apply(event)
+            self.events += 1
+        self._advance(events[-1].time)
+        for light in list(self._on_since):
+            self._close_on_time(light)
+        for since in self._recorded_on_since.values():
+            self.recorded_light_on_seconds += (self.clock - since).total_seconds()
+        self._recorded_on_since.clear()
+        return self.report(events[0].time, events[-1].time)
+
+    def report(
+        self,
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+    ) -> Dict[str, Any]:
+        """Return the replay summary."""
+        return {
+            "start": start.isoformat() if start else None,
+            "end": end.isoformat() if end else None,
+            "events": self.events,
+            "arrivals": self.arrivals,
+            "light_on_minutes": round(self.light_on_seconds / 60, 1),
+            "recorded_light_on_minutes": round(self.recorded_light_on_seconds / 60, 1),
+            "service_calls": self.service_calls,
+            "turn_on_calls": self.turn_on_calls,
+            "turn_off_calls": self.turn_off_calls,
+            "false_offs": self.false_offs,
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the replay from the command line."""
+    parser = argparse.ArgumentParser(description="Replay recorder history through Auto Light.")
+    parser.add_argument("history", help="history export (.csv or .json)")
+    parser.add_argument("--config", required=True, help="JSON file with the entry config")
+    parser.add_argument("--delay-off-time", type=int, help="override delay_off_time (seconds)")
+    parser.add_argument("--brightness-threshold", type=int, help="override brightness_threshold")
+    parser.add_argument("--timezone", help="IANA time zone for schedules (default: local)")
+    parser.add_argument(
+        "--false-off-window",
+        type=float,
+        default=DEFAULT_FALSE_OFF_WINDOW,
+        help="seconds after an automatic turn-off in which a return counts as a false off",
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.config, encoding="utf-8") as config_file:
+        config = json.load(config_file)
+    config = config.get("config", config)
+    if args.delay_off_time is not None:
+        config[CONF_DELAY_OFF_TIME] = args.delay_off_time
+    if args.brightness_threshold is not None:
+        config[CONF_BRIGHTNESS_THRESHOLD] = args.brightness_threshold
+
+    if args.timezone:
+        from zoneinfo import ZoneInfo
+
+        tz = ZoneInfo(args.timezone)
+    else:
+        tz = datetime.datetime.now().astimezone().tzinfo
+
+    simulator = ReplaySimulator(config, tz, args.false_off_window)
+    report = simulator.run(load_history(args.history))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())